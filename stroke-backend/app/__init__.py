@@ -11,28 +11,56 @@ Functions:
 
 from flask import Flask
 from flask_cors import CORS
-from flask_bcrypt import Bcrypt
 from app.config import Config
-from app.models.user import db
+from app.models.user import db, bcrypt
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
+import atexit
+import logging
 import os
-
-# Initialize Flask-Bcrypt extension for password hashing
-bcrypt = Bcrypt()
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
 
 # Set SQLite busy_timeout at connection level to prevent database locks
 @event.listens_for(Engine, "connect")
 def set_sqlite_busy_timeout(dbapi_conn, connection_record):
-    """Set busy_timeout for SQLite connections to prevent 'database is locked' errors"""
+    """Set busy_timeout and WAL journaling for SQLite connections to prevent 'database is locked' errors"""
     try:
         if 'sqlite' in str(dbapi_conn):
             cursor = dbapi_conn.cursor()
             cursor.execute("PRAGMA busy_timeout = 60000")  # 60 seconds in milliseconds
+            # WAL lets readers run alongside a writer; NORMAL skips the fsync per commit (safe in WAL mode)
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
             cursor.close()
     except Exception as e:
         pass  # Silently ignore pragma errors
 
+def configure_queue_logging(app):
+    """
+    Route app.logger output through a queue so request threads never block on stream writes
+    
+    Records are put on an in-memory queue by a QueueHandler; a QueueListener
+    thread writes them to stderr with Flask's usual format.
+    """
+    from flask.logging import default_handler
+    
+    # app.logger is shared by name across create_app() calls; install once
+    if any(isinstance(handler, QueueHandler) for handler in app.logger.handlers):
+        return None
+    
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(default_handler.formatter)
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    
+    app.logger.removeHandler(default_handler)
+    app.logger.addHandler(QueueHandler(log_queue))
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
 def create_app():
     """
     Application Factory Function - Creates and configures Flask app
@@ -63,6 +91,13 @@ def create_app():
     app = Flask(__name__)
     # Load configuration from Config class (database, security settings, etc.)
     app.config.from_object(Config)
+    # Encode the JWT signing key once instead of on every token check
+    app.config['_JWT_KEY_BYTES'] = app.config['SECRET_KEY'].encode('utf-8')
+    # Send app.logger records through a background listener thread
+    configure_queue_logging(app)
+    # Bind UserOperations to the configured user backend once, instead of branching per call
+    from app.utils.database import UserOperations
+    UserOperations.use_backend(bool(app.config.get('USE_MONGODB_USERS', False)))
     
     # ========== INITIALIZE EXTENSIONS ==========
     
@@ -106,6 +141,12 @@ def create_app():
             # Create database tables based on model definitions
             db.create_all()
             
+            # create_all skips tables that already exist, so add indexes
+            # introduced after the users table was first created
+            from app.models.user import User
+            for index in User.__table__.indexes:
+                index.create(db.engine, checkfirst=True)
+            
             # Note: WAL mode and other optimizations are set via SQLALCHEMY_ENGINE_OPTIONS in config.py
             print("✅ Database initialized successfully")
         except Exception as e:
@@ -123,8 +164,8 @@ def create_app():
         
         @return: JSON with status, message, and database type
         """
-        from app.services.patient_service import PatientService
-        patient_service = PatientService()
+        from app.services.patient_service import get_patient_service
+        patient_service = get_patient_service()
         return {
             'status': 'healthy', 
             'message': 'Stroke Care API is running',
@@ -163,9 +204,9 @@ def create_initial_data():
     Note: Only creates data if it doesn't already exist (idempotent)
     """
     from app.models.user import User
-    from app.services.patient_service import PatientService
+    from app.services.patient_service import get_patient_service
     
-    patient_service = PatientService()
+    patient_service = get_patient_service()
     
     # ========== CREATE ADMIN USER ==========
     admin = User.query.filter_by(username='admin').first()
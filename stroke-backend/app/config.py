@@ -52,6 +52,7 @@ class Config:
             'check_same_thread': False,  # Allow SQLite across threads
         },
         'poolclass': NullPool,  # Create new connection for each request, no pooling
+        'query_cache_size': 1000,  # Compiled SQL cache shared across requests
     }
     
     # ========== MONGODB SETTINGS (OPTIONAL) ==========
@@ -63,6 +64,11 @@ class Config:
     USE_MONGODB = os.environ.get('USE_MONGODB', 'false').lower() == 'true'
     # Flag to enable/disable MongoDB for users table (defaults to SQLite)
     USE_MONGODB_USERS = os.environ.get('USE_MONGODB_USERS', 'false').lower() == 'true'
+    # Per-process MongoDB connection pool bounds (keeps sockets per worker capped)
+    MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 20))
+    MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 5))
+    # Wire compression for MongoDB traffic (zstd/snappy need their optional packages)
+    MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', 'zlib')
     
     # ========== JWT AUTHENTICATION SETTINGS ==========
     # Secret key for JWT token generation and validation
@@ -80,9 +86,13 @@ class Config:
     
     # ========== BCRYPT HASHING SETTINGS ==========
     # Number of salt rounds for password hashing (higher = more secure but slower)
-    # 12 is recommended for security vs performance balance
+    # 12 is recommended for security vs performance balance; only tests/conftest.py lowers it
     BCRYPT_LOG_ROUNDS = 12
     
+    # ========== LAST LOGIN SETTINGS ==========
+    # last_login updates are buffered and written in one batch at this interval (seconds)
+    LAST_LOGIN_FLUSH_INTERVAL = 5
+    
     # ========== STROKE RISK THRESHOLDS ==========
     # Risk score percentages for stroke risk classification
     # Used by analytics to categorize patient risk levels
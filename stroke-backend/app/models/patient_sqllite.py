@@ -1,5 +1,6 @@
 from app.models.user import db
 from datetime import datetime
+from sqlalchemy.orm import load_only
 
 class PatientSQLite(db.Model):
     __tablename__ = 'patients'
@@ -44,6 +45,27 @@ class PatientSQLite(db.Model):
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
+    
+    def to_dict_summary(self):
+        # Only touches the columns in SUMMARY_COLUMNS so load_only() rows
+        # are serialised without triggering a refresh of deferred columns
+        return {
+            'id': self.id,
+            'gender': self.gender,
+            'age': self.age,
+            'risk_level': self.risk_level,
+            'stroke_risk': self.stroke_risk,
+            'assigned_doctor_id': self.assigned_doctor_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+    
+    @classmethod
+    def summary_options(cls):
+        # Column subset used by list views that only need the summary payload
+        return load_only(
+            cls.id, cls.gender, cls.age, cls.risk_level,
+            cls.stroke_risk, cls.created_at, cls.assigned_doctor_id
+        )
 
 class MedicalHistorySQLite(db.Model):
     __tablename__ = 'medical_history'
@@ -55,7 +55,7 @@ class User(db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     
     # Authorization and Role
-    role = db.Column(db.String(20), nullable=False, default='patient')  # admin, doctor, patient
+    role = db.Column(db.String(20), nullable=False, default='patient', index=True)  # admin, doctor, patient
     
     # User Information
     first_name = db.Column(db.String(50), nullable=False)
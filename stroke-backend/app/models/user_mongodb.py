@@ -11,14 +11,13 @@ Features:
 - Compatible interface with SQLAlchemy User model
 """
 
-from pymongo import MongoClient
-from flask_bcrypt import Bcrypt
+from pymongo import MongoClient, UpdateOne
 from datetime import datetime, timedelta
 from bson import ObjectId
 import jwt
 from flask import current_app
-
-bcrypt = Bcrypt()
+# Share the app-configured Bcrypt instance so BCRYPT_LOG_ROUNDS applies to both backends
+from app.models.user import bcrypt
 
 class UserMongoDB:
     """
@@ -182,6 +181,7 @@ class UserMongoDBManager:
         # Create unique indexes
         self.users.create_index('username', unique=True)
         self.users.create_index('email', unique=True)
+        self.users.create_index('role')
     
     def create_user(self, user):
         """
@@ -206,6 +206,14 @@ class UserMongoDBManager:
         doc = self.users.find_one({'email': email})
         return UserMongoDB(doc) if doc else None
     
+    def find_for_login(self, username):
+        """Find the credential fields of a user by username (projection for login)"""
+        doc = self.users.find_one(
+            {'username': username},
+            projection={'_id': 1, 'username': 1, 'password_hash': 1, 'role': 1, 'is_active': 1}
+        )
+        return UserMongoDB(doc) if doc else None
+    
     def find_by_id(self, user_id):
         """Find user by ID"""
         try:
@@ -227,6 +235,23 @@ class UserMongoDBManager:
         docs = self.users.find(query)
         return [UserMongoDB(doc) for doc in docs]
     
+    def find_all_paginated(self, role=None, page=1, per_page=50):
+        """
+        Find one page of users, optionally filtered by role
+        
+        @param role: Optional role filter
+        @param page: 1-based page number
+        @param per_page: Users per page
+        @return: List of UserMongoDB instances
+        """
+        query = {'role': role} if role else {}
+        docs = self.users.find(query).sort('_id', 1).skip((page - 1) * per_page).limit(per_page)
+        return [UserMongoDB(doc) for doc in docs]
+    
+    def count_by_role(self, role=None):
+        """Count users, optionally filtered by role"""
+        return self.users.count_documents({'role': role} if role else {})
+    
     def update_user(self, user):
         """
         Update existing user
@@ -272,3 +297,19 @@ class UserMongoDBManager:
             )
         except Exception:
             pass
+    
+    def bulk_update_last_login(self, last_logins):
+        """
+        Write many last_login timestamps in one round-trip
+        
+        @param last_logins: Dict mapping user ID to login datetime
+        """
+        ops = [
+            UpdateOne(
+                {'_id': ObjectId(user_id) if isinstance(user_id, str) else user_id},
+                {'$set': {'last_login': logged_in_at}}
+            )
+            for user_id, logged_in_at in last_logins.items()
+        ]
+        if ops:
+            self.users.bulk_write(ops, ordered=False)
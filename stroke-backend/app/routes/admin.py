@@ -11,14 +11,13 @@ admin_bp = Blueprint('admin', __name__)
 @role_required(['admin'])
 def get_system_stats(current_user):
     try:
-        from app.services.patient_service import PatientService
-        patient_service = PatientService()
-        all_patients = patient_service.get_all_patients()
+        from app.services.patient_service import get_patient_service
+        patient_service = get_patient_service()
+        all_patients = patient_service.get_all_patients(summary=True)
         total_patients = len(all_patients)
 
-        all_users = UserOperations.find_all()
-        total_doctors = len([u for u in all_users if u.role == 'doctor'])
-        total_admins = len([u for u in all_users if u.role == 'admin'])
+        total_doctors = UserOperations.find_count_by_role('doctor')
+        total_admins = UserOperations.find_count_by_role('admin')
         high_risk_patients = len([p for p in all_patients if p.get('risk_level') == 'high'])
         
         today = date.today()
@@ -176,17 +176,16 @@ def login():
             return jsonify({'message': 'Username contains invalid whitespace or characters'}), 400
         password = data['password']
         
-        # Look up user in database
-        user = UserOperations.find_by_username(username)
+        # Verify user exists and password matches (credential columns only; full profile loaded on success)
+        user, login_error = UserOperations.verify_login(username, password)
         
-        # Verify user exists and password matches
-        if not user or not user.check_password(password):
+        if login_error == 'invalid':
             # Log failed login attempt for security audit
             log_security_event(None, 'LOGIN_FAILED', f'Failed login attempt for username: {username}', request.remote_addr)
             return jsonify({'message': 'Invalid username or password'}), 401
         
         # Check if user account is active
-        if not user.is_active:
+        if login_error == 'inactive':
             return jsonify({'message': 'Account is deactivated'}), 401
         
         # Update last login timestamp
@@ -1,11 +1,11 @@
 from flask import Blueprint, request, jsonify, current_app
 from app.models.user import User
-from app.services.patient_service import PatientService
+from app.services.patient_service import get_patient_service
 from app.utils.security import token_required, role_required
 
 # Define the blueprint FIRST
 doctors_bp = Blueprint('doctors', __name__)
-patient_service = PatientService()
+patient_service = get_patient_service()
 
 # THEN define the routes
 @doctors_bp.route('/', methods=['GET'])
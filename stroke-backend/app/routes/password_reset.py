@@ -3,6 +3,7 @@
 
 from flask import Blueprint, request, jsonify, current_app
 from app.models.user import User, db
+from app.utils.database import UserOperations
 from datetime import datetime, timedelta
 import secrets
 import hashlib
@@ -203,6 +204,7 @@ def reset_password():
         # Update password
         user.set_password(new_password)
         db.session.commit()
+        UserOperations.invalidate_cached_user(user.id)
         
         # Remove used token
         if token in reset_tokens:
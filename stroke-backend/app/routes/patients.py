@@ -1,6 +1,6 @@
 ﻿from flask import Blueprint, request, jsonify, current_app
 from sqlalchemy.exc import IntegrityError
-from app.services.patient_service import PatientService
+from app.services.patient_service import get_patient_service
 from app.utils.security import (
     token_required,
     role_required,
@@ -10,9 +10,10 @@ from app.utils.security import (
 )
 from app.utils.validation import validate_patient_data
 from app.models.user import User, db
+from app.utils.database import UserOperations
 
 patients_bp = Blueprint('patients', __name__)
-patient_service = PatientService()
+patient_service = get_patient_service()
 
 PATIENT_FIELDS = [
     'gender',
@@ -180,8 +181,10 @@ def self_register_patient():
         try:
             patient_id = patient_service.create_patient(sanitized_data)
         except Exception as patient_error:
+            user_id = user.id
             db.session.delete(user)
             db.session.commit()
+            UserOperations.invalidate_cached_user(user_id)
             current_app.logger.error(f'Patient creation error: {patient_error}')
             return jsonify({'message': 'Failed to register patient'}), 500
         
@@ -192,8 +195,10 @@ def self_register_patient():
                 'status': 'pending_review'
             }), 201
         else:
+            user_id = user.id
             db.session.delete(user)
             db.session.commit()
+            UserOperations.invalidate_cached_user(user_id)
             return jsonify({'message': 'Failed to register patient'}), 500
     except Exception as e:
         current_app.logger.error(f'Self registration error: {str(e)}')
@@ -205,6 +210,8 @@ def get_patients(current_user):
     try:
         risk_level = request.args.get('risk_level')
         gender = request.args.get('gender')
+        # ?view=summary returns only the list columns (id, gender, age, risk, created_at)
+        summary = request.args.get('view') == 'summary'
         
         filters = {}
         if risk_level:
@@ -212,18 +219,31 @@ def get_patients(current_user):
         if gender:
             filters['gender'] = gender
         
-        if current_user.role == 'doctor':
-            patients = patient_service.get_patients_by_doctor(current_user.id, filters)
-        elif current_user.role == 'admin':
-            patients = patient_service.get_all_patients(filters)
-        else:
+        if current_user.role not in ('doctor', 'admin'):
             return jsonify({'message': 'Insufficient permissions'}), 403
+        doctor_id = current_user.id if current_user.role == 'doctor' else None
         
-        return jsonify({
-            'patients': patients,
-            'count': len(patients),
-            'database': 'mongodb' if patient_service.use_mongodb else 'sqlite'
-        }), 200
+        response = {'database': 'mongodb' if patient_service.use_mongodb else 'sqlite'}
+        
+        # ?limit= / ?cursor= switch to keyset pagination; otherwise return the full list
+        if 'limit' in request.args or 'cursor' in request.args:
+            try:
+                limit = max(1, min(int(request.args.get('limit', 50)), 500))
+                patients, next_cursor = patient_service.get_patients_page(
+                    doctor_id, filters, limit=limit,
+                    cursor=request.args.get('cursor'), summary=summary
+                )
+            except ValueError as page_error:
+                return jsonify({'message': str(page_error)}), 400
+            response['next_cursor'] = next_cursor
+        elif doctor_id:
+            patients = patient_service.get_patients_by_doctor(doctor_id, filters, summary=summary)
+        else:
+            patients = patient_service.get_all_patients(filters, summary=summary)
+        
+        response['patients'] = patients
+        response['count'] = len(patients)
+        return jsonify(response), 200
         
     except Exception as e:
         current_app.logger.error(f'Get patients error: {str(e)}')
@@ -1,14 +1,89 @@
 # app/routes/security.py
 # Security Routes - API endpoints for security log management and monitoring
+# Note: create_app does not register security_bp; the statements and stats helpers
+# below are exercised directly by tests/test_security_logs.py
 
-from flask import Blueprint, request, jsonify
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import select, bindparam, func
 from app.utils.security import token_required, admin_required
+from app.utils.database import db
 from app.models.security_log import SecurityLog
+from app.utils.pagination import keyset_page
 from datetime import datetime, timedelta
 
 # Create security blueprint
 security_bp = Blueprint('security', __name__)
 
+# Fixed-shape statements built once; values are bound per request so the
+# compiled SQL is reused from the engine's query cache
+_FAILED_LOGINS_STMT = (
+    select(SecurityLog)
+    .where(SecurityLog.event_type == 'failed_login')
+    .where(SecurityLog.created_at >= bindparam('since'))
+    .order_by(SecurityLog.created_at.desc())
+    .limit(bindparam('limit'))
+)
+_FAILED_LOGINS_BY_USER_STMT = _FAILED_LOGINS_STMT.where(SecurityLog.username == bindparam('username'))
+_USER_ACTIVITY_STMT = (
+    select(SecurityLog)
+    .where(SecurityLog.user_id == bindparam('user_id'))
+    .order_by(SecurityLog.created_at.desc())
+    .limit(bindparam('limit'))
+)
+
+# Shared pool for the independent aggregations behind /logs/stats
+_STATS_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='security-stats')
+
+
+def _run_in_app_context(app, fn, *args):
+    # Each worker thread gets its own app context and therefore its own session
+    with app.app_context():
+        return fn(*args)
+
+
+def _count_by(column, since):
+    rows = db.session.execute(
+        select(column, func.count()).where(SecurityLog.created_at >= since).group_by(column)
+    ).all()
+    return {value: count for value, count in rows}
+
+
+def _failed_logins_by_ip(since):
+    rows = db.session.execute(
+        select(SecurityLog.ip_address, func.count())
+        .where(SecurityLog.event_type == 'failed_login', SecurityLog.created_at >= since)
+        .group_by(SecurityLog.ip_address)
+    ).all()
+    return {ip: count for ip, count in rows}
+
+
+def _recent_critical_events(since):
+    logs = db.session.scalars(
+        select(SecurityLog)
+        .where(SecurityLog.severity == 'critical', SecurityLog.created_at >= since)
+        .order_by(SecurityLog.created_at.desc())
+        .limit(10)
+    ).all()
+    return [log.to_dict() for log in logs]
+
+
+def _collect_stats(app, since):
+    """
+    Run the independent stats aggregations concurrently on the shared pool
+    
+    @param app: Flask app each worker opens its own app context on
+    @param since: Only count events created at or after this time
+    @return: Dict with events_by_type, events_by_severity, failed_logins_by_ip and critical_events
+    """
+    futures = {
+        'events_by_type': _STATS_POOL.submit(_run_in_app_context, app, _count_by, SecurityLog.event_type, since),
+        'events_by_severity': _STATS_POOL.submit(_run_in_app_context, app, _count_by, SecurityLog.severity, since),
+        'failed_logins_by_ip': _STATS_POOL.submit(_run_in_app_context, app, _failed_logins_by_ip, since),
+        'critical_events': _STATS_POOL.submit(_run_in_app_context, app, _recent_critical_events, since),
+    }
+    return {name: future.result() for name, future in futures.items()}
+
 @security_bp.route('/logs', methods=['GET'])
 @token_required
 @admin_required
@@ -28,14 +103,16 @@ def get_security_logs(current_user):
     - severity: Filter by severity (info, warning, error, critical)
     - hours: Time window in hours (default: 168 = 7 days)
     - status: Filter by status (success, failure, warning, error)
+    - cursor: next_cursor from the previous page (keyset pagination)
     
     Returns:
-    - 200: List of security logs
+    - 200: List of security logs with next_cursor (null on the last page)
+    - 400: Invalid cursor
     - 403: Access denied (not admin)
     """
     try:
         # Get query parameters with defaults
-        limit = min(int(request.args.get('limit', 100)), 1000)
+        limit = max(1, min(int(request.args.get('limit', 100)), 1000))
         event_type = request.args.get('event_type')
         user_id = request.args.get('user_id')
         severity = request.args.get('severity')
@@ -62,15 +139,19 @@ def get_security_logs(current_user):
         if status:
             query = query.filter(SecurityLog.status == status)
         
-        # Execute query
-        logs = query.order_by(SecurityLog.created_at.desc()).limit(limit).all()
+        # Execute query (keyset pagination on created_at, id)
+        try:
+            logs, next_cursor = keyset_page(query, SecurityLog, limit, request.args.get('cursor'))
+        except ValueError as page_error:
+            return jsonify({'message': str(page_error)}), 400
         
         # Convert to dict
         logs_data = [log.to_dict() for log in logs]
         
         return jsonify({
             'logs': logs_data,
-            'total': len(logs_data)
+            'total': len(logs_data),
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
@@ -100,19 +181,18 @@ def get_failed_logins(current_user):
     try:
         username = request.args.get('username')
         hours = int(request.args.get('hours', 24))
-        limit = min(int(request.args.get('limit', 100)), 1000)
+        limit = max(1, min(int(request.args.get('limit', 100)), 1000))
         
         # Get failed login attempts
         time_threshold = datetime.utcnow() - timedelta(hours=hours)
-        query = SecurityLog.query.filter(
-            SecurityLog.event_type == 'failed_login',
-            SecurityLog.created_at >= time_threshold
-        )
+        params = {'since': time_threshold, 'limit': limit}
+        stmt = _FAILED_LOGINS_STMT
         
         if username:
-            query = query.filter(SecurityLog.username == username)
+            stmt = _FAILED_LOGINS_BY_USER_STMT
+            params['username'] = username
         
-        logs = query.order_by(SecurityLog.created_at.desc()).limit(limit).all()
+        logs = db.session.scalars(stmt, params).all()
         
         # Group by IP address to detect patterns
         ip_attempts = {}
@@ -155,12 +235,10 @@ def get_user_activity(current_user, user_id):
         if current_user.id != user_id and current_user.role != 'admin':
             return jsonify({'message': 'Access denied'}), 403
         
-        limit = min(int(request.args.get('limit', 100)), 1000)
+        limit = max(1, min(int(request.args.get('limit', 100)), 1000))
         
         # Get user activity
-        logs = SecurityLog.query.filter(
-            SecurityLog.user_id == user_id
-        ).order_by(SecurityLog.created_at.desc()).limit(limit).all()
+        logs = db.session.scalars(_USER_ACTIVITY_STMT, {'user_id': user_id, 'limit': limit}).all()
         
         return jsonify({
             'logs': [log.to_dict() for log in logs],
@@ -197,40 +275,18 @@ def get_security_stats(current_user):
         hours = int(request.args.get('hours', 24))
         time_threshold = datetime.utcnow() - timedelta(hours=hours)
         
-        # Get all logs in time window
-        logs = SecurityLog.query.filter(
-            SecurityLog.created_at >= time_threshold
-        ).all()
+        # Run the independent aggregations concurrently
+        stats = _collect_stats(current_app._get_current_object(), time_threshold)
+        events_by_type = stats['events_by_type']
+        events_by_severity = stats['events_by_severity']
+        failed_login_ips = stats['failed_logins_by_ip']
+        critical_events = stats['critical_events']
         
-        # Calculate statistics
-        total_events = len(logs)
-        
-        # Events by type
-        events_by_type = {}
-        for log in logs:
-            events_by_type[log.event_type] = events_by_type.get(log.event_type, 0) + 1
-        
-        # Events by severity
-        events_by_severity = {}
-        for log in logs:
-            events_by_severity[log.severity] = events_by_severity.get(log.severity, 0) + 1
-        
-        # Failed logins
-        failed_logins = sum(1 for log in logs if log.event_type == 'failed_login')
+        total_events = sum(events_by_type.values())
+        failed_logins = sum(failed_login_ips.values())
         
         # Suspicious IPs (5+ failed logins)
-        failed_login_ips = {}
-        for log in logs:
-            if log.event_type == 'failed_login' and log.ip_address:
-                failed_login_ips[log.ip_address] = failed_login_ips.get(log.ip_address, 0) + 1
-        
-        suspicious_ips = [ip for ip, count in failed_login_ips.items() if count >= 5]
-        
-        # Recent critical events
-        critical_events = [
-            log.to_dict() for log in logs 
-            if log.severity == 'critical'
-        ][:10]
+        suspicious_ips = [ip for ip, count in failed_login_ips.items() if ip and count >= 5]
         
         return jsonify({
             'time_window_hours': hours,
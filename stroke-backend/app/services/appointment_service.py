@@ -6,36 +6,61 @@ This eliminates SQLite locking issues by using MongoDB which handles concurrent
 """
 
 from flask import current_app
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 from bson.objectid import ObjectId
 from datetime import datetime
+from collections import defaultdict
 import json
+import threading
+
+
+# Fields returned by the batch lookups (enough for dashboard listings)
+APPOINTMENT_SUMMARY_FIELDS = {
+    '_id': 1, 'patient_id': 1, 'doctor_id': 1,
+    'appointment_date': 1, 'appointment_time': 1, 'status': 1
+}
 
 
 class AppointmentMongoDB:
     """MongoDB-based appointment management"""
     
-    def __init__(self, mongo_uri, db_name):
+    # Indexes only need creating once per process, not per instance
+    _indexes_ensured = False
+    
+    def __init__(self, mongo_uri, db_name, max_pool_size=20, min_pool_size=5):
         """Initialize MongoDB connection"""
         try:
-            self.client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+            self.client = MongoClient(
+                mongo_uri,
+                serverSelectionTimeoutMS=5000,
+                maxPoolSize=max_pool_size,
+                minPoolSize=min_pool_size,
+                waitQueueTimeoutMS=2000,
+                retryWrites=True
+            )
             self.db = self.client[db_name]
             self.collection = self.db['appointments']
             
             # Test connection
             self.client.admin.command('ping')
             
-            # Create indexes for fast queries
-            try:
-                self.collection.create_index('patient_id')
-                self.collection.create_index('doctor_id')
-                self.collection.create_index('appointment_date')
-            except:
-                pass  # Indexes may already exist
+            self._ensure_indexes()
         except Exception as e:
             print(f"Warning: Could not connect to MongoDB: {e}. Appointments will fail.")
             self.collection = None
     
+    def _ensure_indexes(self):
+        """Create indexes for fast queries (once per process)"""
+        if AppointmentMongoDB._indexes_ensured:
+            return
+        try:
+            self.collection.create_index('patient_id')
+            self.collection.create_index('doctor_id')
+            self.collection.create_index('appointment_date')
+        except:
+            pass  # Indexes may already exist
+        AppointmentMongoDB._indexes_ensured = True
+    
     def is_connected(self):
         """Check if MongoDB is connected"""
         return self.collection is not None
@@ -81,44 +106,6 @@ class AppointmentMongoDB:
             current_app.logger.error(f"Error creating appointment in MongoDB: {str(e)}")
             raise
     
-    def create_appointment(self, patient_id, doctor_id, appointment_date, appointment_time, 
-                          reason, urgency='routine', status='scheduled', notes=None):
-        """
-        Create new appointment in MongoDB
-        
-        @param patient_id: Patient user ID (string)
-        @param doctor_id: Doctor user ID (string)
-        @param appointment_date: Date string (YYYY-MM-DD)
-        @param appointment_time: Time string (HH:MM)
-        @param reason: Reason for appointment
-        @param urgency: Urgency level (routine/urgent/emergency)
-        @param status: Appointment status (scheduled/completed/cancelled)
-        @param notes: Optional notes
-        @return: Created appointment dict with ID
-        """
-        try:
-            appointment = {
-                'patient_id': str(patient_id),
-                'doctor_id': str(doctor_id),
-                'appointment_date': appointment_date,  # Store as string YYYY-MM-DD
-                'appointment_time': appointment_time,  # Store as string HH:MM
-                'reason': reason,
-                'urgency': urgency,
-                'status': status,
-                'notes': notes,
-                'created_at': datetime.utcnow(),
-                'updated_at': datetime.utcnow()
-            }
-            
-            result = self.collection.insert_one(appointment)
-            appointment['id'] = str(result.inserted_id)
-            appointment['_id'] = str(result.inserted_id)
-            
-            return appointment
-        except Exception as e:
-            current_app.logger.error(f"Error creating appointment in MongoDB: {str(e)}")
-            raise
-    
     def get_appointment(self, appointment_id):
         """Get appointment by ID"""
         try:
@@ -158,6 +145,44 @@ class AppointmentMongoDB:
             current_app.logger.error(f"Error getting doctor appointments: {str(e)}")
             return []
     
+    def get_appointments_for_patients(self, patient_ids, projection=APPOINTMENT_SUMMARY_FIELDS):
+        """
+        Get appointments for many patients in a single query
+        
+        @param patient_ids: List of patient user IDs
+        @param projection: Fields to return (None for full documents)
+        @return: Dict mapping patient_id to a list of appointments
+        """
+        return self._get_appointments_grouped('patient_id', patient_ids, projection)
+    
+    def get_appointments_for_doctors(self, doctor_ids, projection=APPOINTMENT_SUMMARY_FIELDS):
+        """
+        Get appointments for many doctors in a single query
+        
+        @param doctor_ids: List of doctor user IDs
+        @param projection: Fields to return (None for full documents)
+        @return: Dict mapping doctor_id to a list of appointments
+        """
+        return self._get_appointments_grouped('doctor_id', doctor_ids, projection)
+    
+    def _get_appointments_grouped(self, field, ids, projection):
+        grouped = defaultdict(list)
+        if not ids:
+            return grouped
+        try:
+            cursor = self.collection.find(
+                {field: {'$in': [str(i) for i in ids]}},
+                projection=projection
+            ).sort('appointment_date', -1)
+            
+            for apt in cursor:
+                apt['id'] = str(apt['_id'])
+                grouped[apt[field]].append(apt)
+            return grouped
+        except Exception as e:
+            current_app.logger.error(f"Error getting appointments by {field}: {str(e)}")
+            return grouped
+    
     def get_all_appointments(self):
         """Get all appointments"""
         try:
@@ -183,9 +208,34 @@ class AppointmentMongoDB:
             current_app.logger.error(f"Error updating appointment: {str(e)}")
             return False
     
+    def bulk_update_status(self, appointment_ids, status):
+        """
+        Set the status of many appointments in one round-trip
+        
+        @param appointment_ids: List of appointment IDs
+        @param status: New status (scheduled/completed/cancelled)
+        @return: Number of appointments modified
+        """
+        if not appointment_ids:
+            return 0
+        try:
+            now = datetime.utcnow()
+            ops = [
+                UpdateOne({'_id': ObjectId(apt_id)}, {'$set': {'status': status, 'updated_at': now}})
+                for apt_id in appointment_ids
+            ]
+            return self.collection.bulk_write(ops, ordered=False).modified_count
+        except Exception as e:
+            current_app.logger.error(f"Error updating appointment status: {str(e)}")
+            return 0
+    
     def cancel_appointment(self, appointment_id):
         """Cancel appointment"""
-        return self.update_appointment(appointment_id, {'status': 'cancelled'})
+        return self.bulk_update_status([appointment_id], 'cancelled') > 0
+    
+    def cancel_appointments(self, appointment_ids):
+        """Cancel several appointments at once"""
+        return self.bulk_update_status(appointment_ids, 'cancelled')
     
     def complete_appointment(self, appointment_id, notes=None):
         """Mark appointment as completed"""
@@ -197,19 +247,21 @@ class AppointmentMongoDB:
 
 # Global appointment service instance
 _appointment_service = None
+_appointment_service_lock = threading.Lock()
 
 
 def get_appointment_service():
-    """Get or create appointment service instance (lazy initialization)"""
+    """Get or create appointment service instance (lazy initialization, once per process)"""
     global _appointment_service
     
     if _appointment_service is None:
-        try:
-            mongo_uri = current_app.config.get('MONGO_URI', 'mongodb://localhost:27017/')
-            db_name = current_app.config.get('MONGO_DB_NAME', 'stroke_care')
-            _appointment_service = AppointmentMongoDB(mongo_uri, db_name)
-        except Exception as e:
-            print(f"Error initializing appointment service: {e}")
-            _appointment_service = AppointmentMongoDB('mongodb://localhost:27017/', 'stroke_care')
+        with _appointment_service_lock:
+            if _appointment_service is None:
+                _appointment_service = AppointmentMongoDB(
+                    current_app.config.get('MONGO_URI', 'mongodb://localhost:27017/'),
+                    current_app.config.get('MONGO_DB_NAME', 'stroke_care'),
+                    max_pool_size=current_app.config.get('MONGO_MAX_POOL_SIZE', 20),
+                    min_pool_size=current_app.config.get('MONGO_MIN_POOL_SIZE', 5)
+                )
     
     return _appointment_service
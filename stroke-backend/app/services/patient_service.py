@@ -1,9 +1,14 @@
+import threading
 from datetime import datetime
 
 from app.config import Config
 from app.models.patient_mongodb import PatientRecordMongo
 from app.models.patient_sqllite import PatientSQLite, MedicalHistorySQLite
 from app.models.user import db
+from app.utils.pagination import keyset_page
+
+# Patient fields that feed calculate_stroke_risk
+RISK_FIELDS = ('age', 'hypertension', 'heart_disease', 'avg_glucose_level', 'bmi', 'smoking_status', 'stroke')
 
 
 class PatientService:
@@ -30,15 +35,21 @@ class PatientService:
             return self.mongo_service.get_patient(patient_id)
         return self._get_patient_sqlite(patient_id)
 
-    def get_patients_by_doctor(self, doctor_id=None, filters=None):
+    def get_patients_by_doctor(self, doctor_id=None, filters=None, summary=False):
         if self.use_mongodb:
             return self.mongo_service.get_patients_by_doctor(doctor_id, filters)
-        return self._get_patients_by_doctor_sqlite(doctor_id, filters)
+        return self._get_patients_by_doctor_sqlite(doctor_id, filters, summary)
 
-    def get_all_patients(self, filters=None):
+    def get_all_patients(self, filters=None, summary=False):
         if self.use_mongodb:
             return self.mongo_service.get_all_patients(filters)
-        return self._get_all_patients_sqlite(filters)
+        return self._get_all_patients_sqlite(filters, summary)
+
+    def get_patients_page(self, doctor_id=None, filters=None, limit=50, cursor=None, summary=False):
+        if self.use_mongodb:
+            # The MongoDB patient backend has no keyset support; refuse rather than return every row
+            raise ValueError('Pagination (limit/cursor) is not supported on the MongoDB patient backend')
+        return self._get_patients_page_sqlite(doctor_id, filters, limit, cursor, summary)
 
     def update_patient(self, patient_id, update_data):
         if self.use_mongodb:
@@ -101,9 +112,14 @@ class PatientService:
         patient = PatientSQLite.query.get(patient_id)
         return patient.to_dict() if patient else None
 
-    def _get_patients_by_doctor_sqlite(self, doctor_id=None, filters=None):
+    @staticmethod
+    def _patients_query(doctor_id=None, filters=None, summary=False):
         query = PatientSQLite.query
 
+        # summary=True loads only the list-view columns instead of hydrating every field
+        if summary:
+            query = query.options(PatientSQLite.summary_options())
+
         if doctor_id:
             query = query.filter(PatientSQLite.assigned_doctor_id == doctor_id)
 
@@ -113,20 +129,28 @@ class PatientService:
             if 'gender' in filters:
                 query = query.filter(PatientSQLite.gender == filters['gender'])
 
-        patients = query.order_by(PatientSQLite.created_at.desc()).all()
-        return [patient.to_dict() for patient in patients]
+        return query
 
-    def _get_all_patients_sqlite(self, filters=None):
-        query = PatientSQLite.query
+    @staticmethod
+    def _serialize_patients(patients, summary=False):
+        if summary:
+            return [patient.to_dict_summary() for patient in patients]
+        return [patient.to_dict() for patient in patients]
 
-        if filters:
-            if 'risk_level' in filters:
-                query = query.filter(PatientSQLite.risk_level == filters['risk_level'])
-            if 'gender' in filters:
-                query = query.filter(PatientSQLite.gender == filters['gender'])
+    def _get_patients_by_doctor_sqlite(self, doctor_id=None, filters=None, summary=False):
+        query = self._patients_query(doctor_id, filters, summary)
+        patients = query.order_by(PatientSQLite.created_at.desc()).all()
+        return self._serialize_patients(patients, summary)
 
+    def _get_all_patients_sqlite(self, filters=None, summary=False):
+        query = self._patients_query(None, filters, summary)
         patients = query.order_by(PatientSQLite.created_at.desc()).all()
-        return [patient.to_dict() for patient in patients]
+        return self._serialize_patients(patients, summary)
+
+    def _get_patients_page_sqlite(self, doctor_id=None, filters=None, limit=50, cursor=None, summary=False):
+        query = self._patients_query(doctor_id, filters, summary)
+        patients, next_cursor = keyset_page(query, PatientSQLite, limit, cursor)
+        return self._serialize_patients(patients, summary), next_cursor
 
     def _update_patient_sqlite(self, patient_id, update_data):
         patient_id = self._coerce_sqlite_id(patient_id)
@@ -134,17 +158,16 @@ class PatientService:
         if not patient:
             return False
 
+        # Only recompute risk when a risk input actually changes value
+        before = {field: getattr(patient, field) for field in RISK_FIELDS}
+        merged = {field: update_data.get(field, before[field]) for field in RISK_FIELDS}
+
         for key, value in update_data.items():
             if hasattr(patient, key):
                 setattr(patient, key, value)
 
-        if any(
-            field in update_data
-            for field in ['age', 'hypertension', 'heart_disease', 'avg_glucose_level', 'bmi', 'smoking_status']
-        ):
-            patient_data = patient.to_dict()
-            patient_data.update(update_data)
-            patient.stroke_risk = self.calculate_stroke_risk(patient_data)
+        if merged != before:
+            patient.stroke_risk = self.calculate_stroke_risk(merged)
             patient.risk_level = self.get_risk_level(patient.stroke_risk)
 
         patient.updated_at = datetime.utcnow()
@@ -226,3 +249,21 @@ class PatientService:
             return 'medium'
         else:
             return 'low'
+
+
+
+# Global patient service instance
+_patient_service = None
+_patient_service_lock = threading.Lock()
+
+
+def get_patient_service():
+    """Get or create the patient service (the Mongo check runs once per process)"""
+    global _patient_service
+
+    if _patient_service is None:
+        with _patient_service_lock:
+            if _patient_service is None:
+                _patient_service = PatientService()
+
+    return _patient_service
@@ -7,222 +7,546 @@ Routes calls to appropriate backend based on USE_MONGODB_USERS config flag.
 This abstraction layer allows switching between databases without changing route code.
 """
 
-from flask import current_app
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from flask import current_app, g
 from pymongo import MongoClient
-from app.models.user import User as SQLUser, db
+from sqlalchemy import func, inspect, update, delete, bindparam
+from sqlalchemy.orm import make_transient_to_detached
+from app.models.user import User as SQLUser, db, bcrypt
 from app.models.user_mongodb import UserMongoDB, UserMongoDBManager
 
-# Global MongoDB manager instance
+# Global MongoDB manager instance (one client per process)
 _mongo_user_manager = None
+_mongo_user_manager_lock = threading.Lock()
 
 def get_mongo_user_manager():
     """
     Get or create MongoDB user manager instance
     
+    Thread-safe: concurrent first requests share a single pooled client.
+    
     @return: UserMongoDBManager instance
     """
     global _mongo_user_manager
     
     if _mongo_user_manager is None:
-        mongo_uri = current_app.config['MONGO_URI']
-        db_name = current_app.config['MONGO_DB_NAME']
-        client = MongoClient(mongo_uri)
-        _mongo_user_manager = UserMongoDBManager(client, db_name)
+        with _mongo_user_manager_lock:
+            if _mongo_user_manager is None:
+                config = current_app.config
+                client = MongoClient(
+                    config['MONGO_URI'],
+                    maxPoolSize=config.get('MONGO_MAX_POOL_SIZE', 20),
+                    minPoolSize=config.get('MONGO_MIN_POOL_SIZE', 5),
+                    maxIdleTimeMS=30000,
+                    waitQueueTimeoutMS=2000,
+                    retryWrites=True,
+                    compressors=config.get('MONGO_COMPRESSORS', 'zlib')
+                )
+                _mongo_user_manager = UserMongoDBManager(client, config['MONGO_DB_NAME'])
     
     return _mongo_user_manager
 
 
-def use_mongodb_users():
-    """Check if MongoDB should be used for users"""
-    return current_app.config.get('USE_MONGODB_USERS', False)
+class _UserSnapshotCache:
+    """
+    Small thread-safe TTL cache of user column snapshots keyed by user ID
+    
+    Snapshots (plain dicts) are cached rather than model instances so a hit
+    never hands a request an object bound to another request's session.
+    """
+    
+    def __init__(self, maxsize=10000, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, snapshot = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            return snapshot
+    
+    def set(self, key, snapshot):
+        with self._lock:
+            if len(self._data) >= self.maxsize:
+                # Drop expired entries first, then the oldest if still full
+                now = time.monotonic()
+                for stale in [k for k, (expires, _) in self._data.items() if expires < now]:
+                    del self._data[stale]
+                if len(self._data) >= self.maxsize:
+                    self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.monotonic() + self.ttl, snapshot)
+    
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
 
 
-class UserOperations:
+# Authenticated-user lookups (token_required) served from memory for a short TTL
+_user_cache = _UserSnapshotCache()
+
+
+def _defer_user_eviction(user_id):
+    # The change is still pending; evict once it is committed, so a concurrent
+    # lookup can't re-cache the old row between the eviction and the commit
+    g.setdefault('_user_ops_evict', set()).add(str(user_id))
+
+
+def _evict_pending_users(committed):
+    pending = g.pop('_user_ops_evict', None)
+    if committed and pending:
+        for key in pending:
+            _user_cache.pop(key)
+
+
+# Pending last_login writes (user ID -> timestamp), flushed in one batch per interval
+_last_login_buffer = {}
+_last_login_lock = threading.Lock()
+_last_login_timer = None
+_atexit_registered = threading.Event()
+
+
+def _schedule_last_login_flush(app):
+    # Caller holds _last_login_lock
+    global _last_login_timer
+    if _last_login_timer is None:
+        interval = app.config.get('LAST_LOGIN_FLUSH_INTERVAL', 5)
+        _last_login_timer = threading.Timer(interval, flush_last_logins, args=(app,))
+        _last_login_timer.daemon = True
+        _last_login_timer.start()
+
+
+def flush_last_logins(app):
     """
-    Unified User Operations Interface
+    Write all buffered last_login timestamps in a single batch
     
-    Provides consistent API for user operations regardless of backend.
-    Automatically routes to SQLite or MongoDB based on config.
+    @param app: Flask app used to open an app context
     """
+    global _last_login_timer
+    with _last_login_lock:
+        pending = dict(_last_login_buffer)
+        _last_login_buffer.clear()
+        _last_login_timer = None
+    
+    if not pending:
+        return
+    
+    with app.app_context():
+        UserOperations.bulk_update_last_login(pending)
+
+
+def stop_last_login_flush(app):
+    """
+    Cancel the pending flush timer and write the buffered logins now
+    
+    Call on shutdown (e.g. test session teardown) while the database is
+    still reachable, so no timer or atexit flush runs after it is gone.
+    
+    @param app: Flask app used to open an app context
+    """
+    global _last_login_timer
+    with _last_login_lock:
+        timer = _last_login_timer
+        _last_login_timer = None
+    if timer is not None:
+        timer.cancel()
+    flush_last_logins(app)
+
+
+class _SQLUserOps:
+    """SQLite implementations of the backend-specific user operations"""
     
     @staticmethod
     def create_user(username, email, password, role='patient', first_name='', last_name='', 
                    phone=None, specialization=None, license_number=None):
-        """
-        Create new user
-        
-        @param username: Unique username
-        @param email: Unique email
-        @param password: Plain text password (will be hashed)
-        @param role: User role (admin/doctor/patient)
-        @param first_name: User's first name
-        @param last_name: User's last name
-        @param phone: Phone number (optional)
-        @param specialization: Medical specialty (doctors only)
-        @param license_number: Medical license (doctors only)
-        @return: User object or None if creation fails
-        """
         try:
-            if use_mongodb_users():
-                # MongoDB implementation
-                manager = get_mongo_user_manager()
-                user = UserMongoDB()
-                user.username = username
-                user.email = email
-                user.set_password(password)
-                user.role = role
-                user.first_name = first_name
-                user.last_name = last_name
-                user.phone = phone
-                user.specialization = specialization
-                user.license_number = license_number
-                return manager.create_user(user)
-            else:
-                # SQLite implementation
-                user = SQLUser()
-                user.username = username
-                user.email = email
-                user.set_password(password)
-                user.role = role
-                user.first_name = first_name
-                user.last_name = last_name
-                user.phone = phone
-                user.specialization = specialization
-                user.license_number = license_number
-                db.session.add(user)
-                db.session.commit()
-                return user
-        except Exception as e:
-            print(f"Error creating user: {e}")
-            if not use_mongodb_users():
-                db.session.rollback()
+            user = SQLUser()
+            user.username = username
+            user.email = email
+            user.set_password(password)
+            user.role = role
+            user.first_name = first_name
+            user.last_name = last_name
+            user.phone = phone
+            user.specialization = specialization
+            user.license_number = license_number
+            db.session.add(user)
+            db.session.commit()
+            return user
+        except Exception:
+            current_app.logger.exception("Error creating user")
+            db.session.rollback()
             return None
     
     @staticmethod
     def find_by_username(username):
-        """Find user by username"""
-        if use_mongodb_users():
-            manager = get_mongo_user_manager()
-            return manager.find_by_username(username)
-        else:
-            return SQLUser.query.filter_by(username=username).first()
+        return SQLUser.query.filter_by(username=username).first()
     
     @staticmethod
     def find_by_email(email):
-        """Find user by email"""
-        if use_mongodb_users():
-            manager = get_mongo_user_manager()
-            return manager.find_by_email(email)
-        else:
-            return SQLUser.query.filter_by(email=email).first()
+        return SQLUser.query.filter_by(email=email).first()
+    
+    @staticmethod
+    def find_for_login(username):
+        return (
+            db.session.query(SQLUser.id, SQLUser.username, SQLUser.password_hash, SQLUser.role, SQLUser.is_active)
+            .filter(SQLUser.username == username)
+            .first()
+        )
     
     @staticmethod
     def find_by_id(user_id):
-        """Find user by ID"""
-        if use_mongodb_users():
+        return SQLUser.query.get(user_id)
+    
+    @staticmethod
+    def find_all(role=None):
+        if role:
+            return SQLUser.query.filter_by(role=role).all()
+        return SQLUser.query.all()
+    
+    @staticmethod
+    def find_all_paginated(role=None, page=1, per_page=50):
+        query = SQLUser.query
+        if role:
+            query = query.filter_by(role=role)
+        return query.order_by(SQLUser.id).paginate(page=page, per_page=per_page, error_out=False, count=False).items
+    
+    @staticmethod
+    def find_count_by_role(role=None):
+        query = db.session.query(func.count(SQLUser.id))
+        if role:
+            query = query.filter(SQLUser.role == role)
+        return query.scalar()
+    
+    @staticmethod
+    def update_user(user, autocommit=True):
+        if not autocommit or UserOperations.in_batch():
+            # Left pending in the session; committed (and evicted) by the caller / batch()
+            _defer_user_eviction(user.id)
+            return True
+        try:
+            db.session.commit()
+        except Exception:
+            current_app.logger.exception("Error updating user")
+            db.session.rollback()
+            return False
+        # Evict only after the commit so the next lookup reads the new row
+        UserOperations.invalidate_cached_user(user.id)
+        _evict_pending_users(True)
+        return True
+    
+    @staticmethod
+    def delete_user(user_id):
+        try:
+            # Single DELETE statement instead of SELECT + DELETE
+            result = db.session.execute(
+                delete(SQLUser).where(SQLUser.id == user_id),
+                execution_options={'synchronize_session': False}
+            )
+            db.session.commit()
+        except Exception:
+            current_app.logger.exception("Error deleting user")
+            db.session.rollback()
+            return False
+        UserOperations.invalidate_cached_user(user_id)
+        return result.rowcount > 0
+    
+    @staticmethod
+    def bulk_update_last_login(last_logins):
+        try:
+            users = SQLUser.__table__
+            db.session.execute(
+                update(users).where(users.c.id == bindparam('uid')).values(last_login=bindparam('ts')),
+                [{'uid': user_id, 'ts': logged_in_at} for user_id, logged_in_at in last_logins.items()]
+            )
+            db.session.commit()
+        except Exception:
+            current_app.logger.exception("Error flushing last logins")
+            db.session.rollback()
+    
+    @staticmethod
+    def snapshot_user(user):
+        return {attr.key: getattr(user, attr.key) for attr in inspect(SQLUser).column_attrs}
+    
+    @staticmethod
+    def user_from_snapshot(snapshot):
+        # Rebuild a detached instance and attach it to this request's session without a SELECT
+        user = SQLUser(**snapshot)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+    
+    @staticmethod
+    def commit():
+        try:
+            db.session.commit()
+        except Exception:
+            current_app.logger.exception("Error committing")
+            db.session.rollback()
+            _evict_pending_users(False)
+            return
+        _evict_pending_users(True)
+    
+    @staticmethod
+    def rollback():
+        db.session.rollback()
+        _evict_pending_users(False)
+    
+    @staticmethod
+    def finish_batch(success):
+        if not success:
+            db.session.rollback()
+            _evict_pending_users(False)
+            return
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            _evict_pending_users(False)
+            raise
+        _evict_pending_users(True)
+
+
+class _MongoUserOps:
+    """MongoDB implementations of the backend-specific user operations"""
+    
+    @staticmethod
+    def create_user(username, email, password, role='patient', first_name='', last_name='', 
+                   phone=None, specialization=None, license_number=None):
+        try:
             manager = get_mongo_user_manager()
-            return manager.find_by_id(user_id)
-        else:
-            return SQLUser.query.get(user_id)
+            user = UserMongoDB()
+            user.username = username
+            user.email = email
+            user.set_password(password)
+            user.role = role
+            user.first_name = first_name
+            user.last_name = last_name
+            user.phone = phone
+            user.specialization = specialization
+            user.license_number = license_number
+            return manager.create_user(user)
+        except Exception:
+            current_app.logger.exception("Error creating user")
+            return None
+    
+    @staticmethod
+    def find_by_username(username):
+        return get_mongo_user_manager().find_by_username(username)
+    
+    @staticmethod
+    def find_by_email(email):
+        return get_mongo_user_manager().find_by_email(email)
+    
+    @staticmethod
+    def find_for_login(username):
+        return get_mongo_user_manager().find_for_login(username)
+    
+    @staticmethod
+    def find_by_id(user_id):
+        return get_mongo_user_manager().find_by_id(user_id)
     
     @staticmethod
     def find_all(role=None):
+        return get_mongo_user_manager().find_all(role)
+    
+    @staticmethod
+    def find_all_paginated(role=None, page=1, per_page=50):
+        return get_mongo_user_manager().find_all_paginated(role, page, per_page)
+    
+    @staticmethod
+    def find_count_by_role(role=None):
+        return get_mongo_user_manager().count_by_role(role)
+    
+    @staticmethod
+    def update_user(user, autocommit=True):
+        # Each MongoDB update is its own write; there is no pending unit of work
+        try:
+            updated = get_mongo_user_manager().update_user(user)
+        except Exception:
+            current_app.logger.exception("Error updating user")
+            return False
+        # Evict after the write so the next lookup reads the new document
+        UserOperations.invalidate_cached_user(user.id)
+        return updated
+    
+    @staticmethod
+    def delete_user(user_id):
+        try:
+            deleted = get_mongo_user_manager().delete_user(user_id)
+        except Exception:
+            current_app.logger.exception("Error deleting user")
+            return False
+        UserOperations.invalidate_cached_user(user_id)
+        return deleted
+    
+    @staticmethod
+    def bulk_update_last_login(last_logins):
+        try:
+            get_mongo_user_manager().bulk_update_last_login(last_logins)
+        except Exception:
+            current_app.logger.exception("Error flushing last logins")
+    
+    @staticmethod
+    def snapshot_user(user):
+        return user.to_mongo_dict()
+    
+    @staticmethod
+    def user_from_snapshot(snapshot):
+        return UserMongoDB(snapshot)
+    
+    @staticmethod
+    def commit():
+        pass
+    
+    @staticmethod
+    def rollback():
+        pass
+    
+    @staticmethod
+    def finish_batch(success):
+        pass
+
+
+# Operations whose implementation depends on the user backend
+_BACKEND_METHODS = (
+    'create_user', 'find_by_username', 'find_by_email', 'find_for_login', 'find_by_id', 'find_all',
+    'find_all_paginated', 'find_count_by_role', 'update_user', 'delete_user',
+    'bulk_update_last_login', 'snapshot_user', 'user_from_snapshot', 'commit', 'rollback',
+    'finish_batch'
+)
+
+
+class UserOperations:
+    """
+    Unified User Operations Interface
+    
+    Provides consistent API for user operations regardless of backend.
+    The backend-specific methods (create_user, find_*, update_user,
+    delete_user, commit, rollback) are bound from _SQLUserOps or
+    _MongoUserOps once by use_backend(), called from create_app, so
+    calls don't re-check USE_MONGODB_USERS each time.
+    """
+    
+    @classmethod
+    def use_backend(cls, use_mongodb):
         """
-        Find all users, optionally filtered by role
+        Bind the backend-specific operations
         
-        @param role: Optional role filter
-        @return: List of user objects
+        @param use_mongodb: True for MongoDB users, False for SQLite
         """
-        if use_mongodb_users():
-            manager = get_mongo_user_manager()
-            return manager.find_all(role)
-        else:
-            if role:
-                return SQLUser.query.filter_by(role=role).all()
-            return SQLUser.query.all()
+        backend = _MongoUserOps if use_mongodb else _SQLUserOps
+        for name in _BACKEND_METHODS:
+            setattr(cls, name, staticmethod(getattr(backend, name)))
     
     @staticmethod
-    def update_user(user):
+    def verify_login(username, password):
         """
-        Update existing user
+        Check credentials reading only the columns login needs
+        
+        The projected record is never cached. Once the password matches, the
+        full user is loaded through find_by_id_cached, which serves it from
+        the authentication cache when present and otherwise caches the full
+        row for the token_required requests that follow.
         
-        @param user: User object with updated data
-        @return: True if successful, False otherwise
+        @param username: Username to authenticate
+        @param password: Plain text password
+        @return: Tuple of (user, error) - user is None when error is 'invalid' or 'inactive'
         """
-        try:
-            if use_mongodb_users():
-                manager = get_mongo_user_manager()
-                return manager.update_user(user)
-            else:
-                db.session.commit()
-                return True
-        except Exception as e:
-            print(f"Error updating user: {e}")
-            if not use_mongodb_users():
-                db.session.rollback()
-            return False
+        record = UserOperations.find_for_login(username)
+        if not record or not record.password_hash or not bcrypt.check_password_hash(record.password_hash, password):
+            return None, 'invalid'
+        if not record.is_active:
+            return None, 'inactive'
+        user = UserOperations.find_by_id_cached(record.id)
+        return (user, None) if user else (None, 'invalid')
     
     @staticmethod
-    def delete_user(user_id):
+    @contextmanager
+    def batch():
         """
-        Delete user by ID
+        Group several user changes into one commit
         
-        @param user_id: User ID
-        @return: True if deleted, False otherwise
+        Inside the block update_user leaves changes pending; they are
+        committed once on exit, or rolled back if the block raises.
+        Nested batch() blocks join the outermost one.
+        
+        Usage:
+            with UserOperations.batch():
+                UserOperations.update_user(doctor)
+                UserOperations.update_user(patient)
         """
+        if UserOperations.in_batch():
+            yield
+            return
+        
+        g._user_ops_batch = True
         try:
-            if use_mongodb_users():
-                manager = get_mongo_user_manager()
-                return manager.delete_user(user_id)
-            else:
-                user = SQLUser.query.get(user_id)
-                if user:
-                    db.session.delete(user)
-                    db.session.commit()
-                    return True
-                return False
-        except Exception as e:
-            print(f"Error deleting user: {e}")
-            if not use_mongodb_users():
-                db.session.rollback()
-            return False
+            yield
+        except Exception:
+            UserOperations.finish_batch(False)
+            raise
+        else:
+            UserOperations.finish_batch(True)
+        finally:
+            g._user_ops_batch = False
     
     @staticmethod
-    def update_last_login(user_id):
-        """Update user's last login timestamp"""
-        try:
-            if use_mongodb_users():
-                manager = get_mongo_user_manager()
-                manager.update_last_login(user_id)
-            else:
-                from datetime import datetime
-                user = SQLUser.query.get(user_id)
-                if user:
-                    user.last_login = datetime.utcnow()
-                    db.session.commit()
-        except Exception as e:
-            print(f"Error updating last login: {e}")
-            if not use_mongodb_users():
-                db.session.rollback()
+    def in_batch():
+        """Check whether the current context is inside UserOperations.batch()"""
+        return g.get('_user_ops_batch', False)
     
     @staticmethod
-    def commit():
+    def find_by_id_cached(user_id):
         """
-        Commit changes (for SQLite compatibility)
-        No-op for MongoDB
+        Find user by ID, serving repeat lookups from a short-lived cache
+        
+        Used on the authentication path, where the same user is resolved
+        on every request. Entries are dropped by update_user/delete_user.
+        
+        @param user_id: User ID
+        @return: User object or None
         """
-        if not use_mongodb_users():
-            try:
-                db.session.commit()
-            except Exception as e:
-                print(f"Error committing: {e}")
-                db.session.rollback()
+        key = str(user_id)
+        snapshot = _user_cache.get(key)
+        if snapshot is not None:
+            return UserOperations.user_from_snapshot(snapshot)
+        
+        user = UserOperations.find_by_id(user_id)
+        if user:
+            _user_cache.set(key, UserOperations.snapshot_user(user))
+        return user
     
     @staticmethod
-    def rollback():
+    def invalidate_cached_user(user_id):
+        """Drop a user from the authentication cache after it changes"""
+        _user_cache.pop(str(user_id))
+    
+    @staticmethod
+    def update_last_login(user_id):
         """
-        Rollback changes (for SQLite compatibility)
-        No-op for MongoDB
+        Record user's last login timestamp
+        
+        The write is buffered and flushed with other logins every
+        LAST_LOGIN_FLUSH_INTERVAL seconds (and at exit).
         """
-        if not use_mongodb_users():
-            db.session.rollback()
+        app = current_app._get_current_object()
+        with _last_login_lock:
+            _last_login_buffer[user_id] = datetime.utcnow()
+            _schedule_last_login_flush(app)
+            if not _atexit_registered.is_set():
+                _atexit_registered.set()
+                atexit.register(flush_last_logins, app)
+
+
+# SQLite is the default backend until create_app binds the configured one
+UserOperations.use_backend(False)
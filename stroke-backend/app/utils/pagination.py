@@ -0,0 +1,63 @@
+"""
+Pagination Utility - utils/pagination.py
+
+Keyset (cursor) pagination for list endpoints ordered by newest first.
+
+Instead of OFFSET, each page filters on the (created_at, id) of the last row
+returned, so every page costs the same regardless of how deep the client is.
+The cursor handed to clients is an opaque URL-safe base64 string.
+"""
+
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+
+
+def encode_cursor(created_at, row_id):
+    """Encode the (created_at, id) position of a row as an opaque cursor"""
+    raw = f'{created_at.isoformat()}|{row_id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+
+    @param cursor: Opaque cursor string from a previous page
+    @return: Tuple of (created_at datetime, id int)
+    @raises ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, row_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError('Invalid pagination cursor')
+
+
+def keyset_page(query, model, limit, cursor=None):
+    """
+    Fetch one page of a query ordered by created_at DESC, id DESC
+
+    @param query: Base SQLAlchemy query with filters already applied
+    @param model: Model class with created_at and id columns
+    @param limit: Maximum number of rows in the page (at least 1)
+    @param cursor: Cursor of the previous page's last row (optional)
+    @return: Tuple of (rows, next_cursor); next_cursor is None on the last page
+    @raises ValueError: If the cursor is malformed or limit is below 1
+    """
+    if limit < 1:
+        raise ValueError('Page limit must be at least 1')
+    
+    if cursor:
+        cursor_ts, cursor_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < (cursor_ts, cursor_id))
+
+    # Fetch one extra row to find out whether another page exists
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
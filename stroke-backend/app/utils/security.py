@@ -1,55 +1,78 @@
+import logging
 import re
 from functools import wraps
 from flask import request, jsonify, current_app
 import jwt
 from app.utils.database import UserOperations
 
+# Validation / sanitisation patterns compiled once at import
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_TAG_RE = re.compile(r'[<>]')
+_JS_RE = re.compile(r'javascript:', re.IGNORECASE)
+_ON_RE = re.compile(r'on\w+=', re.IGNORECASE)
+
+# JWT verification settings shared by every token_required call
+_JWT_ALGS = ['HS256']
+_JWT_DECODE_OPTIONS = {'require': ['exp', 'user_id']}
+
+# Resolved once at import: find_by_id_cached itself is never rebound (only the
+# backend methods it calls are), so token_required can call it directly
+_find_user_by_id = UserOperations.find_by_id_cached
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
+        logger = current_app.logger
+        # Debug tracing is opt-in; isEnabledFor skips all formatting otherwise
+        debug = logger.isEnabledFor(logging.DEBUG)
         
-        # DEBUG: Log all headers to see what's coming in
-        current_app.logger.info(f'🔍 ALL HEADERS: {dict(request.headers)}')
-        current_app.logger.info(f'🔍 Authorization header present: {"Authorization" in request.headers}')
+        # Get token from header ("Bearer <token>")
+        auth_header = request.headers.get('Authorization')
+        if debug:
+            logger.debug('Authorization header present: %s', auth_header is not None)
         
-        # Get token from header
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            current_app.logger.info(f'🔍 Authorization header value: {auth_header}')
-            try:
-                token = auth_header.split(' ')[1]  # Bearer <token>
-                current_app.logger.info(f'🔍 Extracted token: {token[:20]}...')
-            except IndexError:
-                current_app.logger.error('🔍 Token format error - could not split Authorization header')
-                return jsonify({'message': 'Invalid token format'}), 401
+        if auth_header is None:
+            logger.error('No token found in request')
+            return jsonify({'message': 'Token is missing'}), 401
+        
+        # Second space-separated field, as the original split(' ')[1] did
+        _, sep, rest = auth_header.partition(' ')
+        if not sep:
+            logger.error('Token format error - could not split Authorization header')
+            return jsonify({'message': 'Invalid token format'}), 401
         
+        token = rest.partition(' ')[0]
         if not token:
-            current_app.logger.error('🔍 NO TOKEN FOUND in request')
+            logger.error('No token found in request')
             return jsonify({'message': 'Token is missing'}), 401
         
         try:
             # Decode the token
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_app.logger.info(f'🔍 Decoded token data: {data}')
+            data = jwt.decode(
+                token, current_app.config['_JWT_KEY_BYTES'],
+                algorithms=_JWT_ALGS, options=_JWT_DECODE_OPTIONS
+            )
+            if debug:
+                logger.debug('Decoded token data: %s', data)
             
-            # Get user from database
-            user = UserOperations.find_by_id(data['user_id'])
+            # Get user (cached briefly; the JWT signature and exp are already verified)
+            user = _find_user_by_id(data['user_id'])
             if not user:
-                current_app.logger.error('🔍 User not found in database')
+                logger.error('User not found in database')
                 return jsonify({'message': 'User not found'}), 401
             
             current_user = user
-            current_app.logger.info(f'🔍 Current user: {current_user.username}, Role: {current_user.role}')
+            if debug:
+                logger.debug('Current user: %s, Role: %s', current_user.username, current_user.role)
             
         except jwt.ExpiredSignatureError:
-            current_app.logger.error('🔍 Token expired')
+            logger.error('Token expired')
             return jsonify({'message': 'Token has expired'}), 401
         except jwt.InvalidTokenError:
-            current_app.logger.error('🔍 Invalid token')
+            logger.error('Invalid token')
             return jsonify({'message': 'Token is invalid'}), 401
         except Exception as e:
-            current_app.logger.error(f'🔍 Token decoding error: {str(e)}')
+            logger.error('Token decoding error: %s', e)
             return jsonify({'message': 'Token is invalid'}), 401
         
         return f(current_user, *args, **kwargs)
@@ -77,21 +100,34 @@ def role_required(required_roles):
 
 def validate_email(email):
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return _EMAIL_RE.match(email) is not None
 
 def validate_password(password):
     """Validate password strength"""
     if len(password) < 8:
         return False, 'Password must be at least 8 characters long'
     
-    if not re.search(r'[A-Z]', password):
+    # One pass over the password, stopping as soon as all three classes are seen
+    has_upper = has_lower = has_digit = False
+    for char in password:
+        if 'A' <= char <= 'Z':
+            has_upper = True
+        elif 'a' <= char <= 'z':
+            has_lower = True
+        elif '0' <= char <= '9':
+            has_digit = True
+        else:
+            continue
+        if has_upper and has_lower and has_digit:
+            break
+    
+    if not has_upper:
         return False, 'Password must contain at least one uppercase letter'
     
-    if not re.search(r'[a-z]', password):
+    if not has_lower:
         return False, 'Password must contain at least one lowercase letter'
     
-    if not re.search(r'[0-9]', password):
+    if not has_digit:
         return False, 'Password must contain at least one number'
     
     return True, 'Password is valid'
@@ -102,9 +138,9 @@ def sanitize_input(input_string):
         return input_string
     
     # Remove potentially dangerous characters
-    sanitized = re.sub(r'[<>]', '', str(input_string))
-    sanitized = re.sub(r'javascript:', '', sanitized, flags=re.IGNORECASE)
-    sanitized = re.sub(r'on\w+=', '', sanitized, flags=re.IGNORECASE)
+    sanitized = _TAG_RE.sub('', str(input_string))
+    sanitized = _JS_RE.sub('', sanitized)
+    sanitized = _ON_RE.sub('', sanitized)
     
     return sanitized.strip()
 
@@ -1,5 +1,24 @@
 import re
 
+# Categorical whitelists (frozensets for O(1) membership) and their error messages
+_GENDERS = ('Male', 'Female', 'Other')
+_WORK_TYPES = ('Private', 'Self-employed', 'Govt_job', 'Children', 'Never_worked')
+_SMOKING_STATUSES = ('Never smoked', 'Smokes', 'Formerly smoked', 'Unknown')
+
+_VALID_GENDERS = frozenset(_GENDERS)
+_VALID_WORK_TYPES = frozenset(_WORK_TYPES)
+_VALID_SMOKING_STATUSES = frozenset(_SMOKING_STATUSES)
+
+_GENDER_ERR = f'Gender must be one of: {", ".join(_GENDERS)}'
+_WORK_TYPE_ERR = f'Work type must be one of: {", ".join(_WORK_TYPES)}'
+_SMOKING_STATUS_ERR = f'Smoking status must be one of: {", ".join(_SMOKING_STATUSES)}'
+
+
+def _is_one_of(value, choices):
+    # Non-string values (e.g. lists from JSON) are never valid and may be unhashable
+    return isinstance(value, str) and value in choices
+
+
 def validate_patient_data(patient_data):
     errors = []
     
@@ -20,33 +39,27 @@ def validate_patient_data(patient_data):
     
     # Hypertension and heart disease should be 0 or 1
     hypertension = patient_data.get('hypertension')
-    if hypertension not in [0, 1]:
+    if hypertension not in (0, 1):
         errors.append('Hypertension must be 0 or 1')
     
     heart_disease = patient_data.get('heart_disease')
-    if heart_disease not in [0, 1]:
+    if heart_disease not in (0, 1):
         errors.append('Heart disease must be 0 or 1')
     
     stroke = patient_data.get('stroke')
-    if stroke not in [0, 1]:
+    if stroke not in (0, 1):
         errors.append('Stroke must be 0 or 1')
     
     # Gender validation
-    valid_genders = ['Male', 'Female', 'Other']
-    gender = patient_data.get('gender')
-    if gender not in valid_genders:
-        errors.append(f'Gender must be one of: {", ".join(valid_genders)}')
+    if not _is_one_of(patient_data.get('gender'), _VALID_GENDERS):
+        errors.append(_GENDER_ERR)
     
     # Work type validation
-    valid_work_types = ['Private', 'Self-employed', 'Govt_job', 'Children', 'Never_worked']
-    work_type = patient_data.get('work_type')
-    if work_type not in valid_work_types:
-        errors.append(f'Work type must be one of: {", ".join(valid_work_types)}')
+    if not _is_one_of(patient_data.get('work_type'), _VALID_WORK_TYPES):
+        errors.append(_WORK_TYPE_ERR)
     
     # Smoking status validation
-    valid_smoking_status = ['Never smoked', 'Smokes', 'Formerly smoked', 'Unknown']
-    smoking_status = patient_data.get('smoking_status')
-    if smoking_status not in valid_smoking_status:
-        errors.append(f'Smoking status must be one of: {", ".join(valid_smoking_status)}')
+    if not _is_one_of(patient_data.get('smoking_status'), _VALID_SMOKING_STATUSES):
+        errors.append(_SMOKING_STATUS_ERR)
     
     return errors
\ No newline at end of file
@@ -6,10 +6,15 @@ Initializes the Flask application and starts the development server.
 
 Usage:
     python run.py
+    FLASK_DEBUG=1 python run.py   # enable the Werkzeug debugger
     
-The server will start on http://0.0.0.0:5000 in debug mode
+The server will start on http://0.0.0.0:5000 (multi-threaded, debug off by default).
+For production use a WSGI server instead, e.g.
+    gunicorn --workers 4 --worker-class gthread --threads 8 run:app
 """
 
+import os
+
 from app import create_app
 
 # Create Flask application instance with all configuration, blueprints, and middleware
@@ -24,9 +29,11 @@ if __name__ == '__main__':
     Start Development Server
     
     Parameters:
-    - debug=True: Enable debug mode (without reloader to prevent SQLite locking on Windows)
+    - debug: Only when FLASK_DEBUG=1 (the debugger adds per-request overhead and an interactive console)
     - use_reloader=False: Disable auto-reload to prevent SQLite connection conflicts
     - host='0.0.0.0': Listen on all network interfaces (allows external access)
     - port=5000: Run on port 5000 (matches frontend API_BASE_URL)
+    - threaded=True: Serve concurrent requests on separate threads
     """
-    app.run(debug=True, use_reloader=False, host='0.0.0.0', port=5000)
\ No newline at end of file
+    debug = os.environ.get('FLASK_DEBUG') == '1'
+    app.run(debug=debug, use_reloader=False, host='0.0.0.0', port=5000, threaded=True)
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+Shared MongoDB client for maintenance scripts - scripts/_mongo.py
+
+Scripts import get_client/get_db from here instead of building their own
+MongoClient, so each process opens one pooled, compressed connection using
+the app's MONGO_* settings.
+
+fast=True returns a client with unacknowledged writes (w=0) for
+loading throwaway fixture data: inserts don't wait for the server, so
+duplicate-key and other write errors are NOT reported. Use the default
+acknowledged client whenever errors matter (e.g. migrating real users).
+"""
+
+import atexit
+import os
+import sys
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pymongo import MongoClient
+from app.config import Config
+
+# One client per write mode, created on first use
+_clients = {}
+
+# Fail fast when MongoDB isn't running instead of waiting the 30s driver default
+SERVER_SELECTION_TIMEOUT_MS = 5000
+
+
+def get_client(fast=False):
+    """
+    Return the process-wide MongoClient
+
+    @param fast: Use unacknowledged writes (fixture loads only)
+    @return: MongoClient configured from Config
+    """
+    client = _clients.get(fast)
+    if client is None:
+        options = {'w': 0} if fast else {}
+        client = MongoClient(
+            Config.MONGO_URI,
+            maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+            compressors=Config.MONGO_COMPRESSORS,
+            serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+            **options
+        )
+        _clients[fast] = client
+    return client
+
+
+def get_db(fast=False):
+    """
+    Return the application database on the shared client
+
+    @param fast: Use unacknowledged writes (fixture loads only)
+    @return: pymongo Database for Config.MONGO_DB_NAME
+    """
+    return get_client(fast)[Config.MONGO_DB_NAME]
+
+
+@atexit.register
+def _close_clients():
+    for client in _clients.values():
+        client.close()
@@ -4,6 +4,12 @@ Add Sample Doctors and Patients
 
 This script adds 15 doctors and 15 patients to the database
 with realistic names and credentials.
+
+Passwords are hashed at SEED_BCRYPT_LOG_ROUNDS (env, default 4) to keep the
+script fast, so these are fixture-only hashes: the accounts are for development
+only and must never be used in production. The variable is deliberately separate
+from the app's BCRYPT_LOG_ROUNDS so speeding up seeding never lowers the running
+app's hashing cost.
 """
 
 import sys
@@ -13,10 +19,14 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app import create_app
-from app.models.user import User, db
+from app.models.user import User, db, bcrypt
+from sqlalchemy import func
 from datetime import datetime
 import random
 
+# Low bcrypt cost for fixture data only; login verification reads the cost from the hash
+SEED_BCRYPT_LOG_ROUNDS = int(os.getenv('SEED_BCRYPT_LOG_ROUNDS', '4'))
+
 def add_sample_users():
     """Add 15 doctors and 15 patients to the database"""
     app = create_app()
@@ -63,45 +73,50 @@ def add_sample_users():
                 {"username": "steven_jackson", "email": "steven.jackson@email.com", "full_name": "Steven Jackson"},
             ]
             
+            # Look up every candidate username in one query instead of one per user
+            all_usernames = [u['username'] for u in doctors_data + patients_data]
+            existing = {
+                row[0] for row in
+                db.session.query(User.username).filter(User.username.in_(all_usernames)).all()
+            }
+            
+            # Every sample user of a role shares a password, so hash it once per role
+            doctor_hash = bcrypt.generate_password_hash('doctor123', rounds=SEED_BCRYPT_LOG_ROUNDS).decode('utf-8')
+            patient_hash = bcrypt.generate_password_hash('patient123', rounds=SEED_BCRYPT_LOG_ROUNDS).decode('utf-8')
+            now = datetime.utcnow()
+            
+            def build_rows(users_data, role, password_hash, label):
+                """Build insert rows for entries not already in the database"""
+                for entry in users_data:
+                    if entry['username'] in existing:
+                        print(f"   ⚠️  {label} {entry['username']} already exists, skipping...")
+                    else:
+                        print(f"   ✅ Added {label.lower()}: {entry['full_name']} (username: {entry['username']})")
+                return [
+                    {
+                        'username': entry['username'],
+                        'email': entry['email'],
+                        'role': role,
+                        'password_hash': password_hash,
+                        'is_active': True,
+                        'created_at': now
+                    }
+                    for entry in users_data
+                    if entry['username'] not in existing
+                ]
+            
             # Add doctors
             print("\n👨‍⚕️ Adding doctors...")
-            doctors_created = 0
-            for doc in doctors_data:
-                # Check if doctor already exists
-                existing = User.query.filter_by(username=doc['username']).first()
-                if not existing:
-                    doctor = User(
-                        username=doc['username'],
-                        email=doc['email'],
-                        role='doctor'
-                    )
-                    doctor.set_password('doctor123')  # Default password
-                    db.session.add(doctor)
-                    doctors_created += 1
-                    print(f"   ✅ Added doctor: {doc['full_name']} (username: {doc['username']})")
-                else:
-                    print(f"   ⚠️  Doctor {doc['username']} already exists, skipping...")
+            doctor_rows = build_rows(doctors_data, 'doctor', doctor_hash, 'Doctor')
+            doctors_created = len(doctor_rows)
             
             # Add patients
             print("\n🏥 Adding patients...")
-            patients_created = 0
-            for pat in patients_data:
-                # Check if patient already exists
-                existing = User.query.filter_by(username=pat['username']).first()
-                if not existing:
-                    patient = User(
-                        username=pat['username'],
-                        email=pat['email'],
-                        role='patient'
-                    )
-                    patient.set_password('patient123')  # Default password
-                    db.session.add(patient)
-                    patients_created += 1
-                    print(f"   ✅ Added patient: {pat['full_name']} (username: {pat['username']})")
-                else:
-                    print(f"   ⚠️  Patient {pat['username']} already exists, skipping...")
+            patient_rows = build_rows(patients_data, 'patient', patient_hash, 'Patient')
+            patients_created = len(patient_rows)
             
-            # Commit all changes
+            # Insert all new users in one executemany (no per-object ORM bookkeeping) and commit once
+            db.session.bulk_insert_mappings(User, doctor_rows + patient_rows)
             db.session.commit()
             
             # Show summary
@@ -109,10 +124,13 @@ def add_sample_users():
             print("📊 Summary:")
             print(f"   Doctors created: {doctors_created}")
             print(f"   Patients created: {patients_created}")
-            print(f"   Total users in database: {User.query.count()}")
-            print(f"   - Admins: {User.query.filter_by(role='admin').count()}")
-            print(f"   - Doctors: {User.query.filter_by(role='doctor').count()}")
-            print(f"   - Patients: {User.query.filter_by(role='patient').count()}")
+            role_counts = dict(
+                db.session.query(User.role, func.count(User.id)).group_by(User.role).all()
+            )
+            print(f"   Total users in database: {sum(role_counts.values())}")
+            print(f"   - Admins: {role_counts.get('admin', 0)}")
+            print(f"   - Doctors: {role_counts.get('doctor', 0)}")
+            print(f"   - Patients: {role_counts.get('patient', 0)}")
             print("="*60)
             
             print("\n✅ Sample users added successfully!")
@@ -4,27 +4,68 @@ Add Sample Doctors and Patients to MongoDB
 
 This script adds 15 doctors and 15 patients directly to MongoDB
 bypassing SQLite database lock issues.
+
+Passwords are hashed at SEED_BCRYPT_LOG_ROUNDS (env, default 4) to keep the
+script fast, so these are fixture-only hashes: the accounts are for development
+only and must never be used in production. The variable is deliberately separate
+from the app's BCRYPT_LOG_ROUNDS so speeding up seeding never lowers the running
+app's hashing cost.
+
+The two shared hashes are cached in instance/.bcrypt_cache.json so re-runs
+skip bcrypt entirely; delete the file to force new hashes.
 """
 
 import sys
 import os
-from pymongo import MongoClient
+import hashlib
+import json
+from pymongo.errors import BulkWriteError
 from flask_bcrypt import Bcrypt
 from datetime import datetime
+from _mongo import get_db
 
-# MongoDB connection
-MONGO_URI = "mongodb://localhost:27017/"
-DB_NAME = "stroke_care"
+# MongoDB duplicate key error code
+DUPLICATE_KEY_ERROR = 11000
 
 bcrypt = Bcrypt()
 
+# Low bcrypt cost for fixture data only; login verification reads the cost from the hash
+SEED_BCRYPT_LOG_ROUNDS = int(os.getenv('SEED_BCRYPT_LOG_ROUNDS', '4'))
+
+# Hashes of the shared fixture passwords, reused across runs
+HASH_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'instance', '.bcrypt_cache.json')
+
+def cached_password_hash(password):
+    """
+    Return a bcrypt hash of password, reusing one cached by a previous run
+    
+    Entries are keyed by cost and a SHA-256 of the plaintext, so changing
+    SEED_BCRYPT_LOG_ROUNDS produces a fresh hash and no plaintext is written to disk.
+    
+    @param password: Plaintext fixture password
+    @return: bcrypt hash string
+    """
+    key = f"{SEED_BCRYPT_LOG_ROUNDS}:{hashlib.sha256(password.encode('utf-8')).hexdigest()}"
+    cache = {}
+    if os.path.exists(HASH_CACHE_PATH):
+        with open(HASH_CACHE_PATH) as f:
+            cache = json.load(f)
+    if key in cache:
+        return cache[key]
+    
+    cache[key] = bcrypt.generate_password_hash(password, rounds=SEED_BCRYPT_LOG_ROUNDS).decode('utf-8')
+    os.makedirs(os.path.dirname(HASH_CACHE_PATH), exist_ok=True)
+    with open(HASH_CACHE_PATH, 'w') as f:
+        json.dump(cache, f)
+    return cache[key]
+
 def add_sample_users_to_mongodb():
     """Add 15 doctors and 15 patients to MongoDB users collection"""
     
     try:
-        # Connect to MongoDB
-        client = MongoClient(MONGO_URI)
-        db = client[DB_NAME]
+        # Connect to MongoDB (acknowledged writes, so duplicate-key rejections are reported)
+        db = get_db()
         users_collection = db['users']
         
         print("🔧 Adding sample doctors and patients to MongoDB...")
@@ -69,72 +110,89 @@ def add_sample_users_to_mongodb():
         ]
         
         # Hash password for all users
-        doctor_password_hash = bcrypt.generate_password_hash('doctor123').decode('utf-8')
-        patient_password_hash = bcrypt.generate_password_hash('patient123').decode('utf-8')
+        doctor_password_hash = cached_password_hash('doctor123')
+        patient_password_hash = cached_password_hash('patient123')
+        
+        # Unique indexes make MongoDB reject duplicates, so no existence pre-check is needed;
+        # role is indexed for the per-role counts in the summary
+        users_collection.create_index('username', unique=True)
+        users_collection.create_index('email', unique=True)
+        users_collection.create_index('role')
+        now = datetime.utcnow()
+        
+        def insert_new(docs, label):
+            """Insert docs in one round-trip; duplicate-key rejections count as skipped. Returns number inserted."""
+            duplicates = {}
+            try:
+                users_collection.insert_many(docs, ordered=False)
+            except BulkWriteError as bwe:
+                for err in bwe.details['writeErrors']:
+                    if err['code'] != DUPLICATE_KEY_ERROR:
+                        raise
+                    duplicates[err['index']] = err
+            
+            for index, doc in enumerate(docs):
+                if index in duplicates:
+                    print(f"   ⚠️  {label} {doc['username']} already exists, skipping...")
+                else:
+                    print(f"   ✅ Added {label.lower()}: {doc['first_name']} {doc['last_name']} (username: {doc['username']})")
+            return len(docs) - len(duplicates)
         
         # Add doctors
         print("\n👨‍⚕️ Adding doctors...")
-        doctors_created = 0
-        for doc in doctors_data:
-            # Check if doctor already exists
-            existing = users_collection.find_one({"username": doc['username']})
-            if not existing:
-                doctor_doc = {
-                    "username": doc['username'],
-                    "email": doc['email'],
-                    "password_hash": doctor_password_hash,
-                    "role": "doctor",
-                    "first_name": doc['first_name'],
-                    "last_name": doc['last_name'],
-                    "phone": None,
-                    "specialization": doc['specialization'],
-                    "license_number": f"LIC{1000 + doctors_created}",
-                    "is_active": True,
-                    "created_at": datetime.utcnow(),
-                    "last_login": None
-                }
-                users_collection.insert_one(doctor_doc)
-                doctors_created += 1
-                print(f"   ✅ Added doctor: Dr. {doc['first_name']} {doc['last_name']} - {doc['specialization']} (username: {doc['username']})")
-            else:
-                print(f"   ⚠️  Doctor {doc['username']} already exists, skipping...")
+        new_doctors = [
+            {
+                "username": doc['username'],
+                "email": doc['email'],
+                "password_hash": doctor_password_hash,
+                "role": "doctor",
+                "first_name": doc['first_name'],
+                "last_name": doc['last_name'],
+                "phone": None,
+                "specialization": doc['specialization'],
+                "license_number": f"LIC{1000 + i}",
+                "is_active": True,
+                "created_at": now,
+                "last_login": None
+            }
+            for i, doc in enumerate(doctors_data)
+        ]
+        doctors_created = insert_new(new_doctors, 'Doctor')
         
         # Add patients
         print("\n🏥 Adding patients...")
-        patients_created = 0
-        for pat in patients_data:
-            # Check if patient already exists
-            existing = users_collection.find_one({"username": pat['username']})
-            if not existing:
-                patient_doc = {
-                    "username": pat['username'],
-                    "email": pat['email'],
-                    "password_hash": patient_password_hash,
-                    "role": "patient",
-                    "first_name": pat['first_name'],
-                    "last_name": pat['last_name'],
-                    "phone": None,
-                    "specialization": None,
-                    "license_number": None,
-                    "is_active": True,
-                    "created_at": datetime.utcnow(),
-                    "last_login": None
-                }
-                users_collection.insert_one(patient_doc)
-                patients_created += 1
-                print(f"   ✅ Added patient: {pat['first_name']} {pat['last_name']} (username: {pat['username']})")
-            else:
-                print(f"   ⚠️  Patient {pat['username']} already exists, skipping...")
+        new_patients = [
+            {
+                "username": pat['username'],
+                "email": pat['email'],
+                "password_hash": patient_password_hash,
+                "role": "patient",
+                "first_name": pat['first_name'],
+                "last_name": pat['last_name'],
+                "phone": None,
+                "specialization": None,
+                "license_number": None,
+                "is_active": True,
+                "created_at": now,
+                "last_login": None
+            }
+            for pat in patients_data
+        ]
+        patients_created = insert_new(new_patients, 'Patient')
         
-        # Show summary
+        # Show summary (per-role counts grouped on the server in one query)
+        role_counts = {
+            doc['_id']: doc['count']
+            for doc in users_collection.aggregate([{'$group': {'_id': '$role', 'count': {'$sum': 1}}}])
+        }
         print("\n" + "="*60)
         print("📊 Summary:")
         print(f"   Doctors created: {doctors_created}")
         print(f"   Patients created: {patients_created}")
-        print(f"   Total users in MongoDB: {users_collection.count_documents({})}")
-        print(f"   - Admins: {users_collection.count_documents({'role': 'admin'})}")
-        print(f"   - Doctors: {users_collection.count_documents({'role': 'doctor'})}")
-        print(f"   - Patients: {users_collection.count_documents({'role': 'patient'})}")
+        print(f"   Total users in MongoDB: {sum(role_counts.values())}")
+        print(f"   - Admins: {role_counts.get('admin', 0)}")
+        print(f"   - Doctors: {role_counts.get('doctor', 0)}")
+        print(f"   - Patients: {role_counts.get('patient', 0)}")
         print("="*60)
         
         print("\n✅ Sample users added successfully to MongoDB!")
@@ -142,8 +200,6 @@ def add_sample_users_to_mongodb():
         print("   - All doctors: password 'doctor123'")
         print("   - All patients: password 'patient123'")
         
-        client.close()
-        
     except Exception as e:
         print(f"❌ Error adding sample users to MongoDB: {e}")
         import traceback
@@ -3,7 +3,7 @@ import sqlite3
 conn = sqlite3.connect('instance/stroke_care.db')
 cursor = conn.cursor()
 cursor.execute('SELECT username, password_hash FROM user LIMIT 3')
-results = cursor.fetchall()
+results = cursor.fetchmany(3)
 
 print("SQLite Users:")
 for row in results:
@@ -13,10 +13,10 @@ for row in results:
 conn.close()
 
 print("\nMongoDB Users:")
-from pymongo import MongoClient
-client = MongoClient('mongodb://localhost:27017')
-db = client['stroke_care']
-users = db.users.find().limit(3)
+from _mongo import get_db
+db = get_db()
+# Project only the printed fields so the rest of each document isn't sent or decoded
+users = db.users.find({}, {'username': 1, 'password_hash': 1, '_id': 0}).limit(3)
 for user in users:
     print(f"  Username: {user['username']}")
     print(f"  Password hash: {user.get('password_hash', 'NONE')[:60]}")
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import sys
 import os
@@ -9,36 +10,53 @@ from app import create_app
 from app.models.patient_sqllite import PatientSQLite, db
 from app.models.user import User
 from datetime import datetime
+from sqlalchemy import case, func, select
 
-def calculate_stroke_risk(patient_data):
-    """Calculate stroke risk score"""
-    risk_score = 0
-    age = patient_data.get('age', 0)
-    if age > 60: risk_score += 30
-    elif age > 45: risk_score += 15
-    if patient_data.get('hypertension', 0) == 1: risk_score += 25
-    if patient_data.get('heart_disease', 0) == 1: risk_score += 20
-    
-    glucose_level = patient_data.get('avg_glucose_level', 0)
-    if glucose_level > 150: risk_score += 15
-    elif glucose_level > 120: risk_score += 8
-    
-    bmi = patient_data.get('bmi', 0)
-    if bmi > 30: risk_score += 10
-    elif bmi > 25: risk_score += 5
-    
-    smoking_status = patient_data.get('smoking_status', 'Unknown')
-    if smoking_status == 'smokes': risk_score += 10
-    elif smoking_status == 'formerly smoked': risk_score += 5
-    
-    if patient_data.get('stroke', 0) == 1: risk_score += 30
-    
-    return min(risk_score, 100)
+# Columns the importer needs from the CSV
+REQUIRED_COLUMNS = ['gender', 'age', 'hypertension', 'heart_disease', 'ever_married',
+                    'work_type', 'Residence_type', 'avg_glucose_level', 'bmi',
+                    'smoking_status', 'stroke']
+
+# Compact dtypes for the CSV's categorical columns; repeated strings become categoricals
+DTYPES = {
+    'gender': 'category',
+    'ever_married': 'category',
+    'work_type': 'category',
+    'Residence_type': 'category',
+    'smoking_status': 'category',
+}
+
+# Numeric columns are parsed per chunk with to_numeric(errors='coerce') so one blank
+# or malformed cell skips its row instead of aborting the whole read, then narrowed.
+# Glucose and BMI stay float64 so stored values aren't float32-rounded.
+NUMERIC_DTYPES = {
+    'age': 'float32',
+    'hypertension': 'int8',
+    'heart_disease': 'int8',
+    'avg_glucose_level': 'float64',
+    'bmi': 'float64',
+    'stroke': 'int8',
+}
+
+# Rows read, scored and inserted per batch
+CHUNK_SIZE = 10_000
+
+def calculate_stroke_risk(df):
+    """Calculate stroke risk scores for every row of the DataFrame at once"""
+    risk_score = (
+        np.select([df['age'] > 60, df['age'] > 45], [30, 15], 0)
+        + np.where(df['hypertension'] == 1, 25, 0)
+        + np.where(df['heart_disease'] == 1, 20, 0)
+        + np.select([df['avg_glucose_level'] > 150, df['avg_glucose_level'] > 120], [15, 8], 0)
+        + np.select([df['bmi'] > 30, df['bmi'] > 25], [10, 5], 0)
+        + np.select([df['smoking_status'] == 'smokes', df['smoking_status'] == 'formerly smoked'], [10, 5], 0)
+        + np.where(df['stroke'] == 1, 30, 0)
+    )
+    return np.minimum(risk_score, 100)
 
 def get_risk_level(risk_score):
-    if risk_score >= 50: return 'high'
-    elif risk_score >= 25: return 'medium'
-    else: return 'low'
+    """Map risk scores to 'high' (>= 50), 'medium' (>= 25) or 'low'"""
+    return np.select([risk_score >= 50, risk_score >= 25], ['high', 'medium'], 'low')
 
 def import_stroke_data(csv_file_path, doctor_id=1):
     """Import stroke data from CSV into database"""
@@ -48,20 +66,12 @@ def import_stroke_data(csv_file_path, doctor_id=1):
     
     with app.app_context():
         try:
-            # Read CSV file
+            # Validate required columns from the header alone
             print(f"Reading CSV file: {csv_file_path}")
-            df = pd.read_csv(csv_file_path)
-            
-            # Display basic info
-            print(f"Found {len(df)} records in CSV")
-            print("Columns:", df.columns.tolist())
+            columns = pd.read_csv(csv_file_path, nrows=0).columns.tolist()
+            print("Columns:", columns)
             
-            # Validate required columns
-            required_columns = ['gender', 'age', 'hypertension', 'heart_disease', 'ever_married', 
-                              'work_type', 'Residence_type', 'avg_glucose_level', 'bmi', 
-                              'smoking_status', 'stroke']
-            
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            missing_columns = [col for col in REQUIRED_COLUMNS if col not in columns]
             if missing_columns:
                 print(f"ERROR: Missing columns: {missing_columns}")
                 return
@@ -75,64 +85,60 @@ def import_stroke_data(csv_file_path, doctor_id=1):
                     print("Import cancelled")
                     return
             
-            # Process each row
+            # Stream the CSV in chunks so memory stays bounded by CHUNK_SIZE rows;
+            # each chunk is committed so a failure mid-file keeps earlier chunks
             successful_imports = 0
-            for index, row in df.iterrows():
-                try:
-                    # Handle missing BMI values
-                    bmi_value = row['bmi']
-                    if pd.isna(bmi_value) or bmi_value == 'N/A':
-                        bmi_value = 25.0  # Default value
-                    
-                    # Calculate risk
-                    patient_data = row.to_dict()
-                    risk_score = calculate_stroke_risk(patient_data)
-                    risk_level = get_risk_level(risk_score)
-                    
-                    # Create patient record
-                    patient = PatientSQLite(
-                        gender=str(row['gender']),
-                        age=int(row['age']),
-                        hypertension=int(row['hypertension']),
-                        heart_disease=int(row['heart_disease']),
-                        ever_married=str(row['ever_married']),
-                        work_type=str(row['work_type']),
-                        Residence_type=str(row['Residence_type']),
-                        avg_glucose_level=float(row['avg_glucose_level']),
-                        bmi=float(bmi_value),
-                        smoking_status=str(row['smoking_status']),
-                        stroke=int(row['stroke']),
-                        stroke_risk=risk_score,
-                        risk_level=risk_level,
-                        created_by=doctor_id,  # Assign to admin/doctor
-                        assigned_doctor_id=doctor_id,
-                        created_at=datetime.utcnow(),
-                        updated_at=datetime.utcnow()
-                    )
-                    
-                    db.session.add(patient)
-                    successful_imports += 1
-                    
-                    # Progress indicator
-                    if (index + 1) % 100 == 0:
-                        print(f"Processed {index + 1} records...")
-                        
-                except Exception as e:
-                    print(f"Error processing row {index}: {e}")
+            now = datetime.utcnow()
+            chunks = pd.read_csv(csv_file_path, usecols=REQUIRED_COLUMNS, dtype=DTYPES,
+                                 chunksize=CHUNK_SIZE)
+            for chunk in chunks:
+                # Missing BMI values default to 25.0 (read_csv already parses 'N/A' as NaN)
+                chunk['bmi'] = chunk['bmi'].fillna(25.0)
+                
+                for column in NUMERIC_DTYPES:
+                    chunk[column] = pd.to_numeric(chunk[column], errors='coerce')
+                
+                # Skip rows with any other blank or non-numeric value, as the per-row import did
+                invalid = chunk[list(NUMERIC_DTYPES)].isna().any(axis=1)
+                for index in chunk.index[invalid]:
+                    print(f"Error processing row {index}: missing or non-numeric value")
+                chunk = chunk[~invalid].astype(NUMERIC_DTYPES)
+                if chunk.empty:
                     continue
+                
+                # Score every row in a few vectorized passes instead of once per row
+                chunk['stroke_risk'] = calculate_stroke_risk(chunk)
+                chunk['risk_level'] = get_risk_level(chunk['stroke_risk'].to_numpy())
+                
+                # Build plain row dicts and insert them in one batch, skipping ORM
+                # object construction and per-instance unit-of-work tracking
+                rows = chunk.astype({
+                    'gender': str, 'age': int, 'hypertension': int, 'heart_disease': int,
+                    'ever_married': str, 'work_type': str, 'Residence_type': str,
+                    'smoking_status': str, 'stroke': int,
+                }).assign(
+                    created_by=doctor_id,  # Assign to admin/doctor
+                    assigned_doctor_id=doctor_id,
+                    created_at=now,
+                    updated_at=now
+                ).to_dict('records')
+                
+                db.session.bulk_insert_mappings(PatientSQLite, rows)
+                db.session.commit()
+                successful_imports += len(rows)
+                print(f"Processed {successful_imports} records...")
             
-            # Commit to database
-            db.session.commit()
+            # Show some statistics (total, stroke cases and high risk in one table scan)
+            stats = db.session.execute(select(
+                func.count().label('total'),
+                func.coalesce(func.sum(case((PatientSQLite.stroke == 1, 1), else_=0)), 0).label('stroke_cases'),
+                func.coalesce(func.sum(case((PatientSQLite.risk_level == 'high', 1), else_=0)), 0).label('high_risk')
+            ).select_from(PatientSQLite)).one()
             
             print(f"\n✅ SUCCESS: Imported {successful_imports} patients into database")
-            print(f"📊 Total patients in database: {PatientSQLite.query.count()}")
-            
-            # Show some statistics
-            stroke_cases = PatientSQLite.query.filter_by(stroke=1).count()
-            high_risk = PatientSQLite.query.filter_by(risk_level='high').count()
-            
-            print(f"🩺 Stroke cases: {stroke_cases}")
-            print(f"⚠️  High risk patients: {high_risk}")
+            print(f"📊 Total patients in database: {stats.total}")
+            print(f"🩺 Stroke cases: {stats.stroke_cases}")
+            print(f"⚠️  High risk patients: {stats.high_risk}")
             
         except Exception as e:
             db.session.rollback()
@@ -1,10 +1,15 @@
 # scripts/init_mongodb.py
+#
+# Seeds a local development database with sample data. Writes use write
+# concern 0 (unacknowledged) because the data is throwaway: failed inserts are
+# not reported, so just rerun the script. Never use w=0 for real data - the
+# user migration script keeps acknowledged writes.
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from pymongo import MongoClient
 from app.config import Config
+from _mongo import get_client
 import datetime
 
 def init_mongodb():
@@ -12,7 +17,8 @@ def init_mongodb():
     config = Config()
     
     try:
-        client = MongoClient(config.MONGO_URI)
+        # Seed data only: unacknowledged writes (w=0)
+        client = get_client(fast=True)
         
         # Create database by using it
         db = client[config.MONGO_DB_NAME]
@@ -22,6 +28,15 @@ def init_mongodb():
         users_collection = db['users']
         patients_collection = db['patients']
         
+        # Unique indexes let inserts reject duplicate users without a lookup first;
+        # role backs the per-role user counts
+        users_collection.create_index('username', unique=True)
+        users_collection.create_index('email', unique=True)
+        users_collection.create_index('role')
+        
+        # One creation timestamp shared by all sample documents
+        now = datetime.datetime.utcnow()
+        
         # Sample users
         sample_users = [
             {
@@ -29,14 +44,14 @@ def init_mongodb():
                 "email": "admin@strokecare.com",
                 "password_hash": "hashed_password_here",  # In real app, use proper hashing
                 "role": "admin",
-                "created_at": datetime.datetime.utcnow()
+                "created_at": now
             },
             {
                 "username": "doctor1",
                 "email": "doctor@strokecare.com", 
                 "password_hash": "hashed_password_here",
                 "role": "doctor",
-                "created_at": datetime.datetime.utcnow()
+                "created_at": now
             }
         ]
         
@@ -63,7 +78,7 @@ def init_mongodb():
                 },
                 "stroke_risk": 35.5,
                 "risk_level": "medium",
-                "created_at": datetime.datetime.utcnow()
+                "created_at": now
             },
             {
                 "name": "MongoDB Test Patient 2", 
@@ -86,16 +101,16 @@ def init_mongodb():
                 },
                 "stroke_risk": 68.2,
                 "risk_level": "high",
-                "created_at": datetime.datetime.utcnow()
+                "created_at": now
             }
         ]
         
-        # Insert sample data
-        users_result = users_collection.insert_many(sample_users)
-        patients_result = patients_collection.insert_many(sample_patients)
+        # Insert sample data (unordered, so one rejected document doesn't stop the rest)
+        users_result = users_collection.insert_many(sample_users, ordered=False)
+        patients_result = patients_collection.insert_many(sample_patients, ordered=False)
         
-        print(f"✅ Inserted {len(users_result.inserted_ids)} users")
-        print(f"✅ Inserted {len(patients_result.inserted_ids)} patients")
+        print(f"✅ Sent {len(users_result.inserted_ids)} users")
+        print(f"✅ Sent {len(patients_result.inserted_ids)} patients")
         
         # Verify data
         user_count = users_collection.count_documents({})
@@ -104,7 +119,6 @@ def init_mongodb():
         print(f"📊 Total users: {user_count}")
         print(f"📊 Total patients: {patient_count}")
         
-        client.close()
         print("🎉 MongoDB initialization completed!")
         
     except Exception as e:
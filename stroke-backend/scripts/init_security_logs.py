@@ -38,15 +38,15 @@ def init_security_logs():
             if existing_logs == 0:
                 print("\n📝 Creating sample security logs...")
                 
-                # Get all users for sample data
-                users = User.query.all()
+                # Get all users for sample data (only the columns copied into the logs)
+                users = db.session.query(User.id, User.username, User.role).all()
                 
                 if not users:
                     print("⚠️  No users found. Run init_db.py first to create sample users.")
                     return
                 
                 # Sample event types
-                events = [
+                events = (
                     ('login', 'User logged in successfully', 'success', 'info'),
                     ('logout', 'User logged out', 'success', 'info'),
                     ('failed_login', 'Failed login attempt - invalid credentials', 'failure', 'warning'),
@@ -54,55 +54,51 @@ def init_security_logs():
                     ('user_updated', 'User profile updated', 'success', 'info'),
                     ('patient_accessed', 'Patient record accessed', 'success', 'info'),
                     ('patient_updated', 'Patient record updated', 'success', 'info'),
-                ]
+                )
                 
-                # Create sample logs for the last 7 days
+                # Random IP addresses
+                ip_addresses = (
+                    '192.168.1.100',
+                    '192.168.1.101',
+                    '10.0.0.50',
+                    '172.16.0.25',
+                    '203.0.113.42'  # Some suspicious IPs for testing
+                )
+                
+                # Create sample logs for the last 7 days, drawing every random
+                # user/event/IP in one random.choices call each
                 sample_count = 50
-                created_count = 0
+                now = datetime.utcnow()
+                sampled_users = random.choices(users, k=sample_count)
+                sampled_events = random.choices(events, k=sample_count)
+                sampled_ips = random.choices(ip_addresses, k=sample_count)
+                # Random timestamps in last 7 days, as second offsets from now
+                sampled_offsets = [random.randint(0, 7 * 86400) for _ in range(sample_count)]
                 
-                for i in range(sample_count):
-                    # Random user
-                    user = random.choice(users)
-                    
-                    # Random event
-                    event_type, base_desc, status, severity = random.choice(events)
-                    
+                rows = []
+                for user, (event_type, base_desc, status, severity), ip_address, offset in zip(
+                        sampled_users, sampled_events, sampled_ips, sampled_offsets):
                     # Customize description with user info
                     description = base_desc
                     if 'User' in base_desc:
                         description = base_desc.replace('User', user.username)
                     
-                    # Random timestamp in last 7 days
-                    days_ago = random.randint(0, 7)
-                    hours_ago = random.randint(0, 23)
-                    minutes_ago = random.randint(0, 59)
-                    timestamp = datetime.utcnow() - timedelta(days=days_ago, hours=hours_ago, minutes=minutes_ago)
-                    
-                    # Random IP addresses
-                    ip_addresses = [
-                        '192.168.1.100',
-                        '192.168.1.101',
-                        '10.0.0.50',
-                        '172.16.0.25',
-                        '203.0.113.42'  # Some suspicious IPs for testing
-                    ]
-                    
-                    # Create log entry
-                    log = SecurityLog(
-                        event_type=event_type,
-                        event_description=description,
-                        user_id=user.id,
-                        username=user.username,
-                        user_role=user.role,
-                        ip_address=random.choice(ip_addresses),
-                        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                        status=status,
-                        severity=severity,
-                        created_at=timestamp
-                    )
-                    
-                    db.session.add(log)
-                    created_count += 1
+                    rows.append({
+                        'event_type': event_type,
+                        'event_description': description,
+                        'user_id': user.id,
+                        'username': user.username,
+                        'user_role': user.role,
+                        'ip_address': ip_address,
+                        'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+                        'status': status,
+                        'severity': severity,
+                        'created_at': now - timedelta(seconds=offset)
+                    })
+                
+                # One Core INSERT for all rows instead of building and adding ORM objects
+                db.session.execute(SecurityLog.__table__.insert(), rows)
+                created_count = len(rows)
                 
                 db.session.commit()
                 print(f"✅ Created {created_count} sample security log entries")
@@ -15,9 +15,36 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app import create_app
-from app.models.user import User as SQLUser
+from app.models.user import User as SQLUser, db
 from app.models.user_mongodb import UserMongoDB, UserMongoDBManager
-from pymongo import MongoClient
+from _mongo import get_client
+from pymongo.errors import BulkWriteError
+
+# Users read from SQLite and inserted into MongoDB per round trip
+BATCH_SIZE = 1000
+
+def insert_batch(users_collection, docs):
+    """
+    Insert a batch of user documents, reporting each one
+    
+    Unordered so one bad document (e.g. a duplicate email) doesn't stop the rest.
+    
+    @param users_collection: MongoDB users collection
+    @param docs: List of user documents to insert
+    @return: Tuple of (migrated_count, failed_count)
+    """
+    failed_indexes = {}
+    try:
+        users_collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        failed_indexes = {err['index']: err['errmsg'] for err in e.details['writeErrors']}
+    
+    for index, doc in enumerate(docs):
+        if index in failed_indexes:
+            print(f"❌ Failed to migrate {doc['username']}: {failed_indexes[index]}")
+        else:
+            print(f"✅ Migrated: {doc['username']} ({doc['role']})")
+    return len(docs) - len(failed_indexes), len(failed_indexes)
 
 def migrate_users():
     """Migrate all users from SQLite to MongoDB"""
@@ -38,7 +65,8 @@ def migrate_users():
         print(f"📁 Database: {db_name}")
         
         try:
-            client = MongoClient(mongo_uri)
+            # Acknowledged writes so failed inserts are reported
+            client = get_client()
             manager = UserMongoDBManager(client, db_name)
             
             # Test connection
@@ -49,28 +77,34 @@ def migrate_users():
             print(f"❌ MongoDB connection failed: {e}")
             return
         
-        # Fetch all users from SQLite
+        # Count users in SQLite; the rows themselves are streamed below
         print("\n📊 Fetching users from SQLite...")
-        sql_users = SQLUser.query.all()
+        total_users = SQLUser.query.count()
         
-        if not sql_users:
+        if not total_users:
             print("⚠️  No users found in SQLite database")
             return
         
-        print(f"✅ Found {len(sql_users)} users in SQLite")
+        print(f"✅ Found {total_users} users in SQLite")
+        
+        # Load every existing username in one projection query instead of one lookup per user
+        existing_usernames = {
+            doc['username'] for doc in manager.users.find({}, {'username': 1, '_id': 0})
+        }
         
         # Migrate each user
         migrated_count = 0
         skipped_count = 0
+        failed_count = 0
         
         print("\n🔄 Starting migration...")
         print("-" * 60)
         
-        for sql_user in sql_users:
+        # Stream users in batches so memory is bounded by BATCH_SIZE, not the table size
+        new_docs = []
+        for sql_user in db.session.query(SQLUser).yield_per(BATCH_SIZE):
             # Check if user already exists in MongoDB
-            existing = manager.find_by_username(sql_user.username)
-            
-            if existing:
+            if sql_user.username in existing_usernames:
                 print(f"⏭️  Skipping {sql_user.username} (already exists in MongoDB)")
                 skipped_count += 1
                 continue
@@ -90,18 +124,24 @@ def migrate_users():
             mongo_user.created_at = sql_user.created_at
             mongo_user.last_login = sql_user.last_login
             
-            try:
-                manager.create_user(mongo_user)
-                print(f"✅ Migrated: {sql_user.username} ({sql_user.role})")
-                migrated_count += 1
-            except Exception as e:
-                print(f"❌ Failed to migrate {sql_user.username}: {e}")
+            new_docs.append(mongo_user.to_mongo_dict())
+            if len(new_docs) >= BATCH_SIZE:
+                migrated, failed = insert_batch(manager.users, new_docs)
+                migrated_count += migrated
+                failed_count += failed
+                new_docs = []
+        
+        if new_docs:
+            migrated, failed = insert_batch(manager.users, new_docs)
+            migrated_count += migrated
+            failed_count += failed
         
         print("-" * 60)
         print(f"\n📊 Migration Summary:")
         print(f"   ✅ Migrated: {migrated_count}")
         print(f"   ⏭️  Skipped: {skipped_count}")
-        print(f"   📝 Total: {len(sql_users)}")
+        print(f"   ❌ Failed: {failed_count}")
+        print(f"   📝 Total: {total_users}")
         
         if migrated_count > 0:
             print("\n🎉 Migration completed successfully!")
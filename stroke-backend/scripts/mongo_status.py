@@ -3,9 +3,9 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 from app.config import Config
+from _mongo import get_client
 
 def check_mongodb_status():
     print("🔍 Checking MongoDB Status...")
@@ -17,7 +17,8 @@ def check_mongodb_status():
     print("=" * 50)
     
     try:
-        client = MongoClient(config.MONGO_URI, serverSelectionTimeoutMS=5000)
+        # Shared pooled client (5s server selection timeout), closed at exit
+        client = get_client()
         client.admin.command('ismaster')
         print("✅ MongoDB is running and accessible")
         
@@ -34,7 +35,6 @@ def check_mongodb_status():
         else:
             print(f"❌ Database '{config.MONGO_DB_NAME}' does not exist yet")
         
-        client.close()
         return True
         
     except ConnectionFailure:
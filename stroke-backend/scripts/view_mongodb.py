@@ -1,31 +1,102 @@
 # scripts/view_mongodb.py
 import sys
 import os
-import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from pymongo import MongoClient
 from app.config import Config
-from bson import ObjectId
+from _mongo import get_client
+from bson import json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
+from pymongo.errors import OperationFailure
 
-class JSONEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, ObjectId):
-            return str(o)
-        return super().default(o)
+# orjson (optional, pip install orjson) encodes in C; without it bson.json_util is used.
+# Both emit relaxed Extended JSON, so ObjectIds, dates and other BSON types print the same.
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def view_mongodb_data():
+def _orjson_default(o):
+    return json_util.default(o, json_options=RELAXED_JSON_OPTIONS)
+
+def write_document(doc):
+    """Write one document to stdout as indented relaxed Extended JSON"""
+    if orjson is not None:
+        sys.stdout.flush()
+        # Datetimes go through json_util too, so both paths format them as {"$date": ...}
+        sys.stdout.buffer.write(orjson.dumps(
+            doc, default=_orjson_default,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_PASSTHROUGH_DATETIME
+        ))
+        sys.stdout.buffer.write(b"\n")
+        return
+    sys.stdout.write(json_util.dumps(doc, json_options=RELAXED_JSON_OPTIONS, indent=2))
+    sys.stdout.write("\n")
+
+def collection_stats(db, collection_name):
+    """
+    Fetch document count and storage size for one collection with $collStats
+
+    @param db: pymongo Database
+    @param collection_name: Collection to describe
+    @return: Dict with 'count' and 'size' (empty for views or when $collStats is denied)
+    """
+    try:
+        doc = next(db[collection_name].aggregate(
+            [{'$collStats': {'count': {}, 'storageStats': {}}}]
+        ), {})
+    except OperationFailure:
+        return {}
+    return {'count': doc.get('count', 0), 'size': doc.get('storageStats', {}).get('size', 0)}
+
+def print_query_plan(collection, projection, skip, limit):
+    """Print a collection's indexes and how the viewer's find() would scan it"""
+    print("🗂️  Indexes:")
+    write_document(collection.index_information())
+    
+    explain = collection.find({}, projection).skip(skip).limit(limit).explain()
+    stats = explain.get('executionStats', {})
+    # Walk down to the leaf stage (e.g. LIMIT -> COLLSCAN); newer servers nest it under queryPlan
+    plan = explain.get('queryPlanner', {}).get('winningPlan', {})
+    plan = plan.get('queryPlan', plan)
+    while 'inputStage' in plan:
+        plan = plan['inputStage']
+    stage = plan.get('stage')
+    print(f"🔎 Plan: {stage}, examined {stats.get('totalDocsExamined')} docs "
+          f"to return {stats.get('nReturned')}")
+    if stage == 'COLLSCAN':
+        print("⚠️  Unindexed collection scan - filtered queries on this collection need an index")
+
+def view_mongodb_data(batch_size=1000, fields=None, limit=0, skip=0, explain=False):
+    """
+    Print documents from every collection
+
+    @param batch_size: Documents fetched per cursor round trip
+    @param fields: Field names to project (None for whole documents)
+    @param limit: Maximum documents shown per collection (0 for all)
+    @param skip: Documents skipped at the start of each collection
+    @param explain: Also print each collection's indexes and query plan
+    """
     print("📊 Viewing MongoDB Data...")
     config = Config()
     
     try:
-        client = MongoClient(config.MONGO_URI)
+        # Shared pooled client, closed at exit
+        client = get_client()
+        projection = {field: 1 for field in fields} if fields else None
         db = client[config.MONGO_DB_NAME]
         
         print("✅ Connected to MongoDB successfully!")
         print("=" * 50)
         
-        # List all collections
+        # Database-wide totals from one dbStats command
+        stats = db.command('dbStats')
+        print(f"📦 Documents: {stats.get('objects', 0)} in {stats.get('collections', 0)} collections "
+              f"({stats.get('dataSize', 0)} bytes)")
+        
+        # List all collections (listCollections with nameOnly, so no per-collection metadata)
         collections = db.list_collection_names()
         print(f"📂 Collections: {collections}")
         
@@ -33,29 +104,56 @@ def view_mongodb_data():
             print("ℹ️  No collections found. Database might be empty.")
             return
         
+        # Fetch every collection's stats up front; the pooled client is thread-safe,
+        # so the $collStats round trips overlap instead of running one after another
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            all_stats = dict(zip(collections, pool.map(lambda name: collection_stats(db, name), collections)))
+        
         # Show data from each collection
         for collection_name in collections:
             print(f"\n🏷️  Collection: {collection_name}")
             print("-" * 40)
             
             collection = db[collection_name]
-            count = collection.count_documents({})
-            print(f"📊 Document count: {count}")
-            
-            if count > 0:
-                # Show all documents
-                documents = collection.find()
-                for i, doc in enumerate(documents, 1):
-                    print(f"\n📄 Document #{i}:")
-                    print(json.dumps(doc, cls=JSONEncoder, indent=2))
+            coll_stats = all_stats[collection_name]
+            # Collection metadata count instead of a full count scan; display only,
+            # since views and collections without stats privileges report none
+            if coll_stats:
+                print(f"📊 Document count: {coll_stats['count']} ({coll_stats['size']} bytes)")
             else:
+                print("📊 Document count: unavailable (view or no $collStats privilege)")
+            
+            if explain:
+                print_query_plan(collection, projection, skip, limit)
+            
+            # Stream the documents: the cursor fetches batch_size documents per
+            # round trip and each one is written out as soon as it arrives
+            documents = (collection.find({}, projection)
+                         .skip(skip).limit(limit).batch_size(batch_size))
+            shown = 0
+            for i, doc in enumerate(documents, skip + 1):
+                print(f"\n📄 Document #{i}:")
+                write_document(doc)
+                shown += 1
+            if not shown:
                 print("ℹ️  No documents in this collection")
         
-        client.close()
-        
     except Exception as e:
         print(f"❌ Error: {e}")
         print("💡 Make sure MongoDB is running: mongod --dbpath \"C:\\data\\db\"")
 
 if __name__ == "__main__":
-    view_mongodb_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Print documents from the MongoDB database")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="documents fetched per cursor round trip (default: 1000)")
+    parser.add_argument("--fields", type=lambda value: [f.strip() for f in value.split(",") if f.strip()],
+                        help="comma-separated fields to show, e.g. username,role")
+    parser.add_argument("--limit", type=int, default=0,
+                        help="maximum documents per collection (default: 0, all)")
+    parser.add_argument("--skip", type=int, default=0,
+                        help="documents to skip at the start of each collection")
+    parser.add_argument("--explain", action="store_true",
+                        help="print each collection's indexes and query plan, warning on collection scans")
+    args = parser.parse_args()
+    view_mongodb_data(batch_size=args.batch_size, fields=args.fields, limit=args.limit, skip=args.skip,
+                      explain=args.explain)
@@ -3,9 +3,78 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import csv
+import io
 import sqlite3
+from multiprocessing import Pool
 from app.config import Config
 
+# Tables dumped in parallel, one read-only connection per worker process
+DUMP_PROCESSES = 4
+
+# A worker returns a table's CSV as one string, which is pickled to the parent, so
+# only tables up to this many rows are formatted in the pool. Larger tables are
+# streamed straight to stdout by the parent, keeping memory bounded.
+POOL_MAX_ROWS = 50_000
+
+def quote_identifier(name):
+    """Quote a table name for SQL (PRAGMA arguments can't be bound as parameters)"""
+    return '"' + name.replace('"', '""') + '"'
+
+def connect_read_only(db_path):
+    """Open the database read-only (WAL readers never block each other or the app)"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    # Memory-map up to 256 MB of the file and allow a 64 MB page cache for the full-table reads
+    conn.execute("PRAGMA mmap_size = 268435456")
+    conn.execute("PRAGMA cache_size = -65536")
+    return conn
+
+def write_rows(cursor, quoted_name, out):
+    """Write every row of a table to out as CSV; writerows iterates the cursor in C"""
+    cursor.execute(f"SELECT * FROM {quoted_name}")
+    csv.writer(out, dialect='unix').writerows(cursor)
+
+def dump_table(args):
+    """
+    Format one table's columns, row count and rows (as CSV) in a worker process
+
+    The whole output is held in memory, so rows are only included for tables of
+    at most POOL_MAX_ROWS; the parent streams larger tables itself.
+
+    @param args: Tuple of (db_path, table_name)
+    @return: Tuple of (formatted output, True if the rows still need streaming)
+    """
+    db_path, table_name = args
+    out = io.StringIO()
+    conn = connect_read_only(db_path)
+    try:
+        cursor = conn.cursor()
+        quoted_name = quote_identifier(table_name)
+        
+        out.write(f"\n🏷️  Table: {table_name}\n")
+        out.write("-" * 30 + "\n")
+        
+        # Get table info
+        cursor.execute(f"PRAGMA table_info({quoted_name})")
+        out.write("Columns:\n")
+        for col in cursor.fetchall():
+            out.write(f"  - {col[1]} ({col[2]})\n")
+        
+        # Get row count
+        cursor.execute(f"SELECT COUNT(*) FROM {quoted_name}")
+        count = cursor.fetchone()[0]
+        out.write(f"Total rows: {count}\n")
+        
+        if count > 0:
+            out.write("Data:\n")
+        if count > POOL_MAX_ROWS:
+            return out.getvalue(), True
+        if count > 0:
+            write_rows(cursor, quoted_name, out)
+    finally:
+        conn.close()
+    return out.getvalue(), False
+
 def view_sqlite_data():
     print("📊 Viewing SQLite Data...")
     config = Config()
@@ -21,39 +90,23 @@ def view_sqlite_data():
         return
     
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Get all tables
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = [table[0] for table in cursor.fetchall()]
+        # Get all tables (this connection also streams any table too large for the pool)
+        conn = connect_read_only(db_path)
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table';")]
         
         print(f"📋 Tables: {tables}")
+        if not tables:
+            conn.close()
+            return
+        sys.stdout.flush()
         
-        for table_name in tables:
-            print(f"\n🏷️  Table: {table_name}")
-            print("-" * 30)
-            
-            # Get table info
-            cursor.execute(f"PRAGMA table_info({table_name})")
-            columns = cursor.fetchall()
-            print("Columns:")
-            for col in columns:
-                print(f"  - {col[1]} ({col[2]})")
-            
-            # Get row count
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            count = cursor.fetchone()[0]
-            print(f"Total rows: {count}")
-            
-            # Show all data
-            if count > 0:
-                cursor.execute(f"SELECT * FROM {table_name}")
-                rows = cursor.fetchall()
-                print("Data:")
-                for row in rows:
-                    print(f"  {row}")
-        
+        # Each table is read in its own process; imap keeps the output in table order
+        with Pool(processes=min(DUMP_PROCESSES, len(tables))) as pool:
+            results = pool.imap(dump_table, [(db_path, table_name) for table_name in tables])
+            for table_name, (output, needs_rows) in zip(tables, results):
+                sys.stdout.write(output)
+                if needs_rows:
+                    write_rows(conn.cursor(), quote_identifier(table_name), sys.stdout)
         conn.close()
         
     except Exception as e:
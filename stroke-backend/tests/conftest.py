@@ -1,25 +1,137 @@
+import itertools
+import os
+import shutil
+import tempfile
+
 import pytest
+
+# Give each pytest-xdist worker (gw0, gw1, ...) its own throwaway SQLite file so
+# workers never share or lock each other's database, and tests never touch the
+# development database. Must be set before app.config is imported.
+_worker_id = os.environ.get('PYTEST_XDIST_WORKER', 'main')
+_test_db_dir = tempfile.mkdtemp(prefix='stroke-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_test_db_dir, f'test_{_worker_id}.db')
+# Keep patients and users on the worker's SQLite file even if a developer's .env enables
+# MongoDB, so no test waits on a MongoDB ping (load_dotenv never overrides these)
+os.environ['USE_MONGODB'] = 'false'
+os.environ['USE_MONGODB_USERS'] = 'false'
+
 from app import create_app
-from app.models.user import db
+from app.config import Config
+from app.models.user import db, bcrypt, User
+from app.utils.database import stop_last_login_flush
+# create_app never imports the security log model; import it so db.create_all() creates its table
+from app.models.security_log import SecurityLog  # noqa: F401
+
+# Seed and hash test users at the minimum bcrypt cost; login checks read the cost from the hash.
+# Set on Config here (before create_app copies it) so no environment variable can lower the app's cost
+Config.BCRYPT_LOG_ROUNDS = 4
+
+# Demo users (same accounts as create_initial_data), with their passwords
+SEEDED_USERS = {'admin': 'admin123', 'doctor': 'doctor123', 'patient': 'patient123'}
+
+# Profile fields for each seeded user; inserted in this order so ids match create_initial_data
+SEED_USER_FIELDS = [
+    {'username': 'admin', 'email': 'admin@strokecare.com',
+     'first_name': 'System', 'last_name': 'Administrator', 'role': 'admin'},
+    {'username': 'doctor', 'email': 'doctor@strokecare.com',
+     'first_name': 'John', 'last_name': 'Smith', 'role': 'doctor',
+     'specialization': 'Neurology', 'license_number': 'MED123456'},
+    {'username': 'patient', 'email': 'patient@strokecare.com',
+     'first_name': 'Jane', 'last_name': 'Doe', 'role': 'patient', 'phone': '+1234567890'},
+]
+
+# Sample patient records (same as create_initial_data), assigned to the seeded doctor (id 2)
+SAMPLE_PATIENTS = [
+    {'gender': 'Male', 'age': 45, 'hypertension': 0, 'heart_disease': 0,
+     'ever_married': 'Yes', 'work_type': 'Private', 'Residence_type': 'Urban',
+     'avg_glucose_level': 95.0, 'bmi': 26.5, 'smoking_status': 'Never smoked', 'stroke': 0,
+     'created_by': 1, 'assigned_doctor_id': 2},
+    {'gender': 'Female', 'age': 67, 'hypertension': 1, 'heart_disease': 0,
+     'ever_married': 'Yes', 'work_type': 'Self-employed', 'Residence_type': 'Rural',
+     'avg_glucose_level': 145.0, 'bmi': 28.1, 'smoking_status': 'Formerly smoked', 'stroke': 0,
+     'created_by': 1, 'assigned_doctor_id': 2},
+]
+
+def seed_demo_data():
+    """Insert the demo users in one bulk statement (hashed at the test bcrypt cost) and the sample patients"""
+    from app.services.patient_service import get_patient_service
+    
+    users = [
+        User(**fields, password_hash=bcrypt.generate_password_hash(
+            SEEDED_USERS[fields['username']]).decode('utf-8'))
+        for fields in SEED_USER_FIELDS
+    ]
+    db.session.bulk_save_objects(users)
+    db.session.commit()
+    
+    patient_service = get_patient_service()
+    if not patient_service.get_all_patients():
+        for patient_data in SAMPLE_PATIENTS:
+            patient_service.create_patient(dict(patient_data))
 
 @pytest.fixture(scope='session')
 def app():
-    # Create app with testing config
+    # Create app with testing config (create_app creates tables but never seeds data)
     app = create_app()
     app.config['TESTING'] = True
-    # Use in-memory SQLite for tests
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
 
-    # Create database tables in app context
+    # The worker database starts empty; seed the demo users and patients once per session
     with app.app_context():
         db.create_all()
-        # create_initial_data is called inside create_app; ensure tables exist
+        seed_demo_data()
     yield app
+    # Write buffered last_login updates before the database file is deleted
+    stop_last_login_flush(app)
+    shutil.rmtree(_test_db_dir, ignore_errors=True)
 
-@pytest.fixture(scope='function')
+@pytest.fixture(scope='session')
 def client(app):
+    # One test client for the whole session; auth is by bearer token, so no per-test cookie state
     return app.test_client()
 
+@pytest.fixture(scope='session')
+def auth_tokens(client):
+    # Log each seeded user in once per session instead of once per test (bcrypt check each time)
+    tokens = {}
+    for username, password in SEEDED_USERS.items():
+        resp = client.post('/api/auth/login', json={'username': username, 'password': password})
+        tokens[username] = resp.get_json()['token'] if resp.status_code == 200 else None
+    return tokens
+
+@pytest.fixture(scope='session')
+def auth_headers(auth_tokens):
+    # Authorization header dict per seeded user, built once (users whose login failed are omitted)
+    return {username: {'Authorization': f'Bearer {token}'}
+            for username, token in auth_tokens.items() if token}
+
+@pytest.fixture(scope='session')
+def seed_patient_id(client, auth_headers):
+    # ID of a patient in the doctor's list, looked up once (the session seed guarantees one)
+    resp = client.get('/api/doctors/patients', headers=auth_headers['doctor'])
+    patients = resp.get_json().get('patients', []) if resp.status_code == 200 else []
+    if not patients:
+        pytest.skip('No patients available for the doctor')
+    return patients[0].get('id') or patients[0].get('_id')
+
+@pytest.fixture(scope='session')
+def run_counter():
+    # Per-session sequence for unique test usernames; each worker's database starts empty
+    return itertools.count(1)
+
+@pytest.fixture(scope='session')
+def route_map(app):
+    # Every registered URL rule, without trailing slashes
+    return {rule.rule.rstrip('/') for rule in app.url_map.iter_rules()}
+
+@pytest.fixture(scope='session')
+def require_route(route_map):
+    # Skip (instead of requesting) when a test targets a route this app doesn't register
+    def require(rule):
+        if rule.rstrip('/') not in route_map:
+            pytest.skip(f'{rule} is not registered')
+    return require
+
 @pytest.fixture(scope='function')
 def runner(app):
     return app.test_cli_runner()
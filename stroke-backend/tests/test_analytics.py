@@ -6,12 +6,20 @@ import json
 import pytest
 
 
-def login_helper(client, username='doctor', password='doctor123'):
-    """Helper to login and get auth token"""
-    resp = client.post('/api/auth/login', json={'username': username, 'password': password})
-    if resp.status_code == 200:
-        return resp.get_json()['token']
-    return None
+def login_helper(auth_tokens, username='doctor'):
+    """Helper to get the session-cached auth token (None if login failed)"""
+    return auth_tokens.get(username)
+
+
+@pytest.fixture(scope='module')
+def dashboard_stats(app, auth_tokens, auth_headers):
+    """Fetch the doctor's dashboard stats once; returns (status_code, data)"""
+    token = login_helper(auth_tokens)
+    if not token:
+        pytest.skip("Doctor login failed")
+    
+    resp = app.test_client().get('/api/analytics/dashboard-stats', headers=auth_headers['doctor'])
+    return resp.status_code, resp.get_json()
 
 
 class TestDashboardStatistics:
@@ -22,17 +30,11 @@ class TestDashboardStatistics:
         resp = client.get('/api/analytics/dashboard-stats')
         assert resp.status_code in (401, 400)
     
-    def test_doctor_get_dashboard_stats(self, client):
+    def test_doctor_get_dashboard_stats(self, dashboard_stats):
         """Test that doctors can access dashboard statistics"""
-        token = login_helper(client)
-        if not token:
-            pytest.skip("Doctor login failed")
-        
-        headers = {'Authorization': f'Bearer {token}'}
-        resp = client.get('/api/analytics/dashboard-stats', headers=headers)
+        status_code, data = dashboard_stats
         
-        assert resp.status_code == 200
-        data = resp.get_json()
+        assert status_code == 200
         
         # Verify expected fields
         expected_fields = ['total_patients', 'risk_distribution', 'average_age']
@@ -40,13 +42,13 @@ class TestDashboardStatistics:
             if field in data:
                 assert data[field] is not None
     
-    def test_admin_get_dashboard_stats(self, client):
+    def test_admin_get_dashboard_stats(self, client, auth_tokens, auth_headers):
         """Test that admins can access dashboard statistics"""
-        token = login_helper(client, 'admin', 'admin123')
+        token = login_helper(auth_tokens, 'admin')
         if not token:
             pytest.skip("Admin login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['admin']
         resp = client.get('/api/analytics/dashboard-stats', headers=headers)
         
         assert resp.status_code == 200
@@ -57,18 +59,11 @@ class TestDashboardStatistics:
 class TestRiskAnalysis:
     """Tests for risk analysis endpoints"""
     
-    def test_get_risk_distribution(self, client):
+    def test_get_risk_distribution(self, dashboard_stats):
         """Test risk distribution analytics"""
-        token = login_helper(client)
-        if not token:
-            pytest.skip("Doctor login failed")
+        status_code, data = dashboard_stats
         
-        headers = {'Authorization': f'Bearer {token}'}
-        resp = client.get('/api/analytics/dashboard-stats', headers=headers)
-        
-        if resp.status_code == 200:
-            data = resp.get_json()
-            
+        if status_code == 200:
             if 'risk_distribution' in data:
                 risk_dist = data['risk_distribution']
                 assert isinstance(risk_dist, dict)
@@ -77,19 +72,13 @@ class TestRiskAnalysis:
                 # This is acceptable in test environment
                 assert isinstance(risk_dist, dict)
     
-    def test_risk_statistics_accuracy(self, client):
+    def test_risk_statistics_accuracy(self, client, auth_headers, dashboard_stats):
         """Test that risk statistics are calculated accurately"""
-        token = login_helper(client)
-        if not token:
-            pytest.skip("Doctor login failed")
-        
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['doctor']
         
         # Get dashboard stats
-        resp = client.get('/api/analytics/dashboard-stats', headers=headers)
-        if resp.status_code == 200:
-            data = resp.get_json()
-            
+        status_code, data = dashboard_stats
+        if status_code == 200:
             # Get patient count
             resp = client.get('/api/doctors/patients', headers=headers)
             if resp.status_code == 200:
@@ -106,35 +95,21 @@ class TestRiskAnalysis:
 class TestAgeAnalytics:
     """Tests for age-based analytics"""
     
-    def test_average_age_calculation(self, client):
+    def test_average_age_calculation(self, dashboard_stats):
         """Test average age calculation"""
-        token = login_helper(client)
-        if not token:
-            pytest.skip("Doctor login failed")
+        status_code, data = dashboard_stats
         
-        headers = {'Authorization': f'Bearer {token}'}
-        resp = client.get('/api/analytics/dashboard-stats', headers=headers)
-        
-        if resp.status_code == 200:
-            data = resp.get_json()
-            
+        if status_code == 200:
             if 'average_age' in data:
                 avg_age = data['average_age']
                 # Should be realistic human age
                 assert 0 <= avg_age <= 150
     
-    def test_age_distribution(self, client):
+    def test_age_distribution(self, dashboard_stats):
         """Test age distribution analytics"""
-        token = login_helper(client)
-        if not token:
-            pytest.skip("Doctor login failed")
+        status_code, data = dashboard_stats
         
-        headers = {'Authorization': f'Bearer {token}'}
-        resp = client.get('/api/analytics/dashboard-stats', headers=headers)
-        
-        if resp.status_code == 200:
-            data = resp.get_json()
-            
+        if status_code == 200:
             # Check if age groups are present
             if 'age_groups' in data or 'age_distribution' in data:
                 age_data = data.get('age_groups', data.get('age_distribution'))
@@ -144,34 +119,20 @@ class TestAgeAnalytics:
 class TestConditionAnalytics:
     """Tests for medical condition analytics"""
     
-    def test_hypertension_statistics(self, client):
+    def test_hypertension_statistics(self, dashboard_stats):
         """Test hypertension patient statistics"""
-        token = login_helper(client)
-        if not token:
-            pytest.skip("Doctor login failed")
-        
-        headers = {'Authorization': f'Bearer {token}'}
-        resp = client.get('/api/analytics/dashboard-stats', headers=headers)
+        status_code, data = dashboard_stats
         
-        if resp.status_code == 200:
-            data = resp.get_json()
-            
+        if status_code == 200:
             # Should have condition statistics
             if 'hypertension_count' in data or 'conditions' in data:
                 assert True  # Statistics are being tracked
     
-    def test_heart_disease_statistics(self, client):
+    def test_heart_disease_statistics(self, dashboard_stats):
         """Test heart disease patient statistics"""
-        token = login_helper(client)
-        if not token:
-            pytest.skip("Doctor login failed")
-        
-        headers = {'Authorization': f'Bearer {token}'}
-        resp = client.get('/api/analytics/dashboard-stats', headers=headers)
+        status_code, data = dashboard_stats
         
-        if resp.status_code == 200:
-            data = resp.get_json()
-            
+        if status_code == 200:
             # Check for heart disease stats
             if 'heart_disease_count' in data or 'conditions' in data:
                 assert True
@@ -180,25 +141,25 @@ class TestConditionAnalytics:
 class TestAnalyticsFiltering:
     """Tests for analytics filtering and parameters"""
     
-    def test_analytics_time_range(self, client):
+    def test_analytics_time_range(self, client, auth_tokens, auth_headers):
         """Test analytics with time range filters"""
-        token = login_helper(client)
+        token = login_helper(auth_tokens)
         if not token:
             pytest.skip("Doctor login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['doctor']
         
         # Try with date range parameter
         resp = client.get('/api/analytics/dashboard-stats?days=30', headers=headers)
         assert resp.status_code in (200, 400)
     
-    def test_analytics_by_risk_level(self, client):
+    def test_analytics_by_risk_level(self, client, auth_tokens, auth_headers):
         """Test filtering analytics by risk level"""
-        token = login_helper(client)
+        token = login_helper(auth_tokens)
         if not token:
             pytest.skip("Doctor login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['doctor']
         
         # Request high-risk patient analytics
         resp = client.get('/api/analytics/dashboard-stats?risk_level=high', headers=headers)
@@ -208,15 +169,15 @@ class TestAnalyticsFiltering:
 class TestAnalyticsPerformance:
     """Tests for analytics performance and optimization"""
     
-    def test_analytics_response_time(self, client):
+    def test_analytics_response_time(self, client, auth_tokens, auth_headers):
         """Test that analytics respond in reasonable time"""
         import time
         
-        token = login_helper(client)
+        token = login_helper(auth_tokens)
         if not token:
             pytest.skip("Doctor login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['doctor']
         
         start_time = time.time()
         resp = client.get('/api/analytics/dashboard-stats', headers=headers)
@@ -226,13 +187,13 @@ class TestAnalyticsPerformance:
         assert (end_time - start_time) < 5.0
         assert resp.status_code == 200
     
-    def test_analytics_with_large_dataset(self, client):
+    def test_analytics_with_large_dataset(self, client, auth_tokens, auth_headers):
         """Test analytics performance with multiple patients"""
-        token = login_helper(client)
+        token = login_helper(auth_tokens)
         if not token:
             pytest.skip("Doctor login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['doctor']
         
         # Get patients
         resp = client.get('/api/doctors/patients', headers=headers)
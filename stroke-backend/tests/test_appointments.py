@@ -5,26 +5,37 @@ Tests appointment booking, cancellation, and access control
 import json
 import pytest
 from datetime import datetime, timedelta
+from unittest import mock
 
+from bson.objectid import ObjectId
 
-def login_helper(client, username='doctor', password='doctor123'):
-    """Helper to login and get auth token"""
-    resp = client.post('/api/auth/login', json={'username': username, 'password': password})
-    if resp.status_code == 200:
-        return resp.get_json()['token']
-    return None
+from app.services.appointment_service import AppointmentMongoDB, APPOINTMENT_SUMMARY_FIELDS
+
+
+def login_helper(auth_tokens, username='doctor'):
+    """Helper to get the session-cached auth token (None if login failed)"""
+    return auth_tokens.get(username)
+
+
+@pytest.fixture
+def mock_appointment_service(app):
+    """AppointmentMongoDB backed by a mocked collection (no MongoDB connection)"""
+    service = AppointmentMongoDB.__new__(AppointmentMongoDB)
+    service.collection = mock.MagicMock()
+    with app.app_context():
+        yield service
 
 
 class TestAppointmentCreation:
     """Unit tests for appointment creation"""
     
-    def test_create_appointment_as_patient(self, client):
+    def test_create_appointment_as_patient(self, client, auth_tokens, auth_headers):
         """Test that patients can create appointments"""
-        token = login_helper(client, 'patient', 'patient123')
+        token = login_helper(auth_tokens, 'patient')
         if not token:
             pytest.skip("Patient login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['patient']
         
         # Create appointment
         future_date = (datetime.now() + timedelta(days=7)).isoformat()
@@ -42,71 +53,31 @@ class TestAppointmentCreation:
         if resp.status_code in (200, 201):
             data = resp.get_json()
             assert 'appointment' in data or 'id' in data
-    
-    def test_appointment_requires_future_date(self, client):
-        """Test that appointments cannot be created in the past"""
-        token = login_helper(client, 'patient', 'patient123')
-        if not token:
-            pytest.skip("Patient login failed")
-        
-        headers = {'Authorization': f'Bearer {token}'}
-        
-        # Try to create appointment in the past
-        past_date = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-        appointment_data = {
-            'doctor_id': 1,
-            'appointment_date': past_date,
-            'appointment_time': '10:00',
-            'reason': 'Test'
-        }
-        
-        resp = client.post('/api/appointments/book', headers=headers, json=appointment_data)
-        # Should reject past dates
-        assert resp.status_code in (400, 422, 201)
-    
-    def test_appointment_requires_valid_doctor(self, client):
-        """Test that appointments require valid doctor ID"""
-        token = login_helper(client, 'patient', 'patient123')
-        if not token:
-            pytest.skip("Patient login failed")
-        
-        headers = {'Authorization': f'Bearer {token}'}
-        
-        future_date = (datetime.now() + timedelta(days=7)).isoformat()
-        appointment_data = {
-            'doctor_id': 99999,  # Non-existent doctor
-            'appointment_date': future_date,
-            'reason': 'Test'
-        }
-        
-        resp = client.post('/api/appointments', headers=headers, json=appointment_data)
-        # Should reject invalid doctor
-        assert resp.status_code in (400, 404, 201)
 
 
 class TestAppointmentRetrieval:
     """Tests for fetching appointments"""
     
-    def test_patient_get_own_appointments(self, client):
+    def test_patient_get_own_appointments(self, client, auth_tokens, auth_headers):
         """Test that patients can view their own appointments"""
-        token = login_helper(client, 'patient', 'patient123')
+        token = login_helper(auth_tokens, 'patient')
         if not token:
             pytest.skip("Patient login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['patient']
         resp = client.get('/api/appointments/', headers=headers, follow_redirects=True)
         
         assert resp.status_code == 200
         data = resp.get_json()
         assert 'appointments' in data or isinstance(data, list)
     
-    def test_doctor_get_appointments(self, client):
+    def test_doctor_get_appointments(self, client, auth_tokens, auth_headers):
         """Test that doctors can view their appointments"""
-        token = login_helper(client, 'doctor', 'doctor123')
+        token = login_helper(auth_tokens, 'doctor')
         if not token:
             pytest.skip("Doctor login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['doctor']
         resp = client.get('/api/appointments/', headers=headers, follow_redirects=True)
         
         assert resp.status_code == 200
@@ -122,14 +93,14 @@ class TestAppointmentRetrieval:
 class TestAppointmentUpdate:
     """Tests for appointment updates"""
     
-    def test_update_appointment_status(self, client):
+    def test_update_appointment_status(self, client, auth_tokens, auth_headers):
         """Test updating appointment status"""
         # First create an appointment
-        token = login_helper(client, 'patient', 'patient123')
+        token = login_helper(auth_tokens, 'patient')
         if not token:
             pytest.skip("Patient login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['patient']
         
         # Get existing appointments
         resp = client.get('/api/appointments', headers=headers)
@@ -147,13 +118,13 @@ class TestAppointmentUpdate:
                 
                 assert resp.status_code in (200, 201, 403, 404)
     
-    def test_cancel_appointment(self, client):
+    def test_cancel_appointment(self, client, auth_tokens, auth_headers):
         """Test appointment cancellation"""
-        token = login_helper(client, 'patient', 'patient123')
+        token = login_helper(auth_tokens, 'patient')
         if not token:
             pytest.skip("Patient login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['patient']
         
         # Get appointments
         resp = client.get('/api/appointments', headers=headers)
@@ -172,13 +143,13 @@ class TestAppointmentUpdate:
 class TestAppointmentAccessControl:
     """Tests for appointment access control"""
     
-    def test_patient_cannot_view_others_appointments(self, client):
+    def test_patient_cannot_view_others_appointments(self, client, auth_tokens, auth_headers):
         """Test that patients can only view their own appointments"""
-        token = login_helper(client, 'patient', 'patient123')
+        token = login_helper(auth_tokens, 'patient')
         if not token:
             pytest.skip("Patient login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['patient']
         resp = client.get('/api/appointments', headers=headers)
         
         if resp.status_code == 200:
@@ -190,13 +161,13 @@ class TestAppointmentAccessControl:
                 # Verify patient_id matches or is current user
                 assert 'patient_id' in appointment or 'doctor_id' in appointment
     
-    def test_doctor_can_view_assigned_appointments(self, client):
+    def test_doctor_can_view_assigned_appointments(self, client, auth_tokens, auth_headers):
         """Test that doctors can view appointments assigned to them"""
-        token = login_helper(client, 'doctor', 'doctor123')
+        token = login_helper(auth_tokens, 'doctor')
         if not token:
             pytest.skip("Doctor login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['doctor']
         resp = client.get('/api/appointments/', headers=headers, follow_redirects=True)
         
         assert resp.status_code == 200
@@ -208,41 +179,120 @@ class TestAppointmentAccessControl:
 class TestAppointmentValidation:
     """Tests for appointment data validation"""
     
-    def test_appointment_requires_reason(self, client):
-        """Test that appointment reason is validated"""
-        token = login_helper(client, 'patient', 'patient123')
-        if not token:
-            pytest.skip("Patient login failed")
-        
-        headers = {'Authorization': f'Bearer {token}'}
-        
-        future_date = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
-        invalid_data = {
+    # (endpoint, payload, accepted status codes) for each invalid booking
+    INVALID_BOOKINGS = [
+        pytest.param('/api/appointments/book', {
             'doctor_id': 1,
-            'appointment_date': future_date,
+            'appointment_date': (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d'),
+            'appointment_time': '10:00',
+            'reason': 'Test'
+        }, (400, 422, 201), id='past_date'),
+        pytest.param('/api/appointments', {
+            'doctor_id': 99999,  # Non-existent doctor
+            'appointment_date': (datetime.now() + timedelta(days=7)).isoformat(),
+            'reason': 'Test'
+        }, (400, 404, 201), id='unknown_doctor'),
+        pytest.param('/api/appointments/book', {
+            'doctor_id': 1,
+            'appointment_date': (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d'),
             'appointment_time': '10:00'
             # Missing reason
-        }
-        
-        resp = client.post('/api/appointments/book', headers=headers, json=invalid_data)
-        # Should require reason
-        assert resp.status_code in (400, 422)
+        }, (400, 422), id='missing_reason'),
+        pytest.param('/api/appointments/book', {
+            'doctor_id': 1,
+            'appointment_date': 'invalid-date-format',
+            'appointment_time': '10:00',
+            'reason': 'Test'
+        }, (400, 422), id='bad_date_format'),
+    ]
     
-    def test_appointment_date_format(self, client):
-        """Test date format validation"""
-        token = login_helper(client, 'patient', 'patient123')
+    @pytest.mark.parametrize('endpoint,payload,expected', INVALID_BOOKINGS)
+    def test_create_rejects_invalid(self, client, auth_tokens, auth_headers, endpoint, payload, expected):
+        """Test that invalid bookings are rejected (past date, unknown doctor, missing reason, bad date)"""
+        token = login_helper(auth_tokens, 'patient')
         if not token:
             pytest.skip("Patient login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['patient']
+        resp = client.post(endpoint, headers=headers, json=payload)
+        assert resp.status_code in expected
+
+
+class TestAppointmentBatchLookups:
+    """Unit tests for the single-query appointment lookups, against a mocked collection"""
+    
+    def test_appointments_for_patients_single_query(self, mock_appointment_service):
+        """Test that many patients are fetched with one $in query and grouped by patient"""
+        collection = mock_appointment_service.collection
+        collection.find.return_value.sort.return_value = [
+            {'_id': 'a1', 'patient_id': '1', 'doctor_id': '2'},
+            {'_id': 'a2', 'patient_id': '3', 'doctor_id': '2'},
+            {'_id': 'a3', 'patient_id': '1', 'doctor_id': '2'},
+        ]
         
-        invalid_data = {
-            'doctor_id': 1,
-            'appointment_date': 'invalid-date-format',
-            'appointment_time': '10:00',
-            'reason': 'Test'
-        }
+        grouped = mock_appointment_service.get_appointments_for_patients([1, 3])
+        
+        collection.find.assert_called_once_with(
+            {'patient_id': {'$in': ['1', '3']}}, projection=APPOINTMENT_SUMMARY_FIELDS
+        )
+        collection.find.return_value.sort.assert_called_once_with('appointment_date', -1)
+        assert [apt['id'] for apt in grouped['1']] == ['a1', 'a3']
+        assert [apt['id'] for apt in grouped['3']] == ['a2']
+    
+    def test_appointments_for_doctors_single_query(self, mock_appointment_service):
+        """Test that many doctors are fetched with one $in query and grouped by doctor"""
+        collection = mock_appointment_service.collection
+        collection.find.return_value.sort.return_value = [
+            {'_id': 'a1', 'patient_id': '1', 'doctor_id': '2'},
+            {'_id': 'a2', 'patient_id': '1', 'doctor_id': '5'},
+        ]
+        
+        grouped = mock_appointment_service.get_appointments_for_doctors(['2', '5'], projection=None)
+        
+        collection.find.assert_called_once_with({'doctor_id': {'$in': ['2', '5']}}, projection=None)
+        assert set(grouped) == {'2', '5'}
+        assert grouped['2'][0]['id'] == 'a1'
+        assert grouped['5'][0]['id'] == 'a2'
+    
+    def test_no_ids_skips_query(self, mock_appointment_service):
+        """Test that an empty ID list returns no groups without querying"""
+        assert mock_appointment_service.get_appointments_for_patients([]) == {}
+        mock_appointment_service.collection.find.assert_not_called()
+
+
+class TestAppointmentBulkStatus:
+    """Unit tests for batched appointment status updates, against a mocked collection"""
+    
+    def test_bulk_update_status_single_bulk_write(self, mock_appointment_service):
+        """Test that one unordered bulk_write sets the status on every appointment"""
+        collection = mock_appointment_service.collection
+        collection.bulk_write.return_value.modified_count = 2
+        ids = [str(ObjectId()), str(ObjectId())]
+        
+        assert mock_appointment_service.bulk_update_status(ids, 'completed') == 2
         
-        resp = client.post('/api/appointments/book', headers=headers, json=invalid_data)
-        # Should reject invalid date format
-        assert resp.status_code in (400, 422)
+        collection.bulk_write.assert_called_once()
+        ops = collection.bulk_write.call_args.args[0]
+        assert collection.bulk_write.call_args.kwargs == {'ordered': False}
+        assert [op._filter for op in ops] == [{'_id': ObjectId(apt_id)} for apt_id in ids]
+        assert all(op._doc['$set']['status'] == 'completed' for op in ops)
+        collection.update_one.assert_not_called()
+    
+    def test_cancel_appointments(self, mock_appointment_service):
+        """Test that cancelling several appointments is one bulk_write returning the modified count"""
+        collection = mock_appointment_service.collection
+        collection.bulk_write.return_value.modified_count = 1
+        ids = [str(ObjectId()), str(ObjectId()), str(ObjectId())]
+        
+        # One of the three was already cancelled or missing
+        assert mock_appointment_service.cancel_appointments(ids) == 1
+        
+        collection.bulk_write.assert_called_once()
+        ops = collection.bulk_write.call_args.args[0]
+        assert len(ops) == 3
+        assert all(op._doc['$set']['status'] == 'cancelled' for op in ops)
+    
+    def test_empty_ids_skip_write(self, mock_appointment_service):
+        """Test that an empty ID list modifies nothing without writing"""
+        assert mock_appointment_service.cancel_appointments([]) == 0
+        mock_appointment_service.collection.bulk_write.assert_not_called()
@@ -1,4 +1,7 @@
 import json
+from unittest import mock
+
+from app.utils.database import UserOperations
 
 
 def test_login_success(client):
@@ -17,3 +20,62 @@ def test_login_bad_credentials(client):
     assert resp.status_code == 401
     data = resp.get_json()
     assert 'Invalid' in data['message'] or 'invalid' in data['message'].lower()
+
+
+def test_repeated_authenticated_requests(client):
+    # Second request is served from the authenticated-user cache
+    resp = client.post('/api/auth/login', json={'username': 'doctor', 'password': 'doctor123'})
+    headers = {'Authorization': f"Bearer {resp.get_json()['token']}"}
+    resp = client.get('/api/auth/me', headers=headers)
+    assert resp.status_code == 200
+    assert resp.get_json()['user']['username'] == 'doctor'
+    
+    with mock.patch.object(UserOperations, 'find_by_id', wraps=UserOperations.find_by_id) as find_by_id:
+        resp = client.get('/api/auth/me', headers=headers)
+    assert resp.status_code == 200
+    assert resp.get_json()['user']['username'] == 'doctor'
+    assert find_by_id.call_count == 0
+
+
+def test_user_changes_evict_cached_user(client, app, run_counter):
+    # update_user/delete_user must drop the cached snapshot, not serve a stale role/is_active
+    username = f'cache_user_{next(run_counter)}'
+    with app.app_context():
+        user = UserOperations.create_user(username, f'{username}@example.com', 'cachepass123')
+        assert user is not None
+    
+    resp = client.post('/api/auth/login', json={'username': username, 'password': 'cachepass123'})
+    headers = {'Authorization': f"Bearer {resp.get_json()['token']}"}
+    resp = client.get('/api/auth/me', headers=headers)
+    assert resp.get_json()['user']['role'] == 'patient'
+    assert resp.get_json()['user']['is_active'] is True
+    
+    with app.app_context():
+        user = UserOperations.find_by_username(username)
+        user.role = 'doctor'
+        user.is_active = False
+        assert UserOperations.update_user(user)
+        user_id = user.id
+    
+    resp = client.get('/api/auth/me', headers=headers)
+    assert resp.status_code == 200
+    assert resp.get_json()['user']['role'] == 'doctor'
+    assert resp.get_json()['user']['is_active'] is False
+    
+    with app.app_context():
+        assert UserOperations.delete_user(user_id)
+    
+    resp = client.get('/api/auth/me', headers=headers)
+    assert resp.status_code == 401
+    assert resp.get_json()['message'] == 'User not found'
+
+
+def test_malformed_authorization_header(client):
+    # No separator at all is a format error; "Bearer " with nothing after it is a missing token
+    resp = client.get('/api/auth/me', headers={'Authorization': 'Bearer'})
+    assert resp.status_code == 401
+    assert resp.get_json()['message'] == 'Invalid token format'
+    
+    resp = client.get('/api/auth/me', headers={'Authorization': 'Bearer '})
+    assert resp.status_code == 401
+    assert resp.get_json()['message'] == 'Token is missing'
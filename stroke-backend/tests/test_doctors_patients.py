@@ -1,10 +1,10 @@
 import json
 
 
-def login_and_get_token(client, username='doctor', password='doctor123'):
-    resp = client.post('/api/auth/login', json={'username': username, 'password': password})
-    assert resp.status_code == 200
-    return resp.get_json()['token']
+def login_and_get_token(auth_tokens, username='doctor'):
+    token = auth_tokens.get(username)
+    assert token is not None
+    return token
 
 
 def test_get_doctor_patients_requires_auth(client):
@@ -13,9 +13,9 @@ def test_get_doctor_patients_requires_auth(client):
     assert resp.status_code in (401, 400)
 
 
-def test_get_doctor_patients_with_token(client):
-    token = login_and_get_token(client)
-    headers = {'Authorization': f'Bearer {token}'}
+def test_get_doctor_patients_with_token(client, auth_tokens, auth_headers):
+    token = login_and_get_token(auth_tokens)
+    headers = auth_headers['doctor']
     resp = client.get('/api/doctors/patients', headers=headers)
     assert resp.status_code == 200
     data = resp.get_json()
@@ -1,56 +1,57 @@
 import json
 
+import pytest
 
-def test_patient_registration_and_fetch(client):
-    """Integration test: patient can fetch doctor patients list and verify seeded patients"""
-    # 1. Doctor logs in
-    doctor_login = {'username': 'doctor', 'password': 'doctor123'}
-    resp = client.post('/api/auth/login', json=doctor_login)
-    assert resp.status_code == 200
-    token = resp.get_json()['token']
+
+@pytest.fixture(scope='module')
+def doctor_state(client, auth_tokens, auth_headers):
+    """Fetch the doctor's patient list and dashboard stats once for the read-only integration tests"""
+    assert auth_tokens['doctor'] is not None, "Doctor login failed"
+    headers = auth_headers['doctor']
     
-    # 2. Doctor fetches patients list
-    headers = {'Authorization': f'Bearer {token}'}
-    resp = client.get('/api/doctors/patients', headers=headers)
-    assert resp.status_code == 200
-    data = resp.get_json()
+    patients_resp = client.get('/api/doctors/patients', headers=headers)
+    analytics_resp = client.get('/api/analytics/dashboard-stats', headers=headers)
+    return {
+        'patients_status': patients_resp.status_code,
+        'patients': patients_resp.get_json(),
+        'analytics_status': analytics_resp.status_code,
+        'analytics': analytics_resp.get_json(),
+    }
+
+
+def test_patient_registration_and_fetch(doctor_state):
+    """Integration test: patient can fetch doctor patients list and verify seeded patients"""
+    # 1. Doctor fetches patients list
+    assert doctor_state['patients_status'] == 200
+    data = doctor_state['patients']
     assert 'patients' in data
     patients = data.get('patients', [])
-    # Should have seeded sample patients from create_initial_data()
+    # Should have seeded sample patients
     assert len(patients) >= 1, "Should have at least sample patients"
     
-    # 3. Verify patient structure
+    # 2. Verify patient structure
     if patients:
         first_patient = patients[0]
         assert 'age' in first_patient or 'id' in first_patient or '_id' in first_patient
 
 
-def test_doctor_edit_patient_and_fetch_analytics(client):
+def test_doctor_edit_patient_and_fetch_analytics(doctor_state):
     """Integration test: doctor fetches patient data and analytics"""
-    # 1. Login as doctor
-    doctor_login = {'username': 'doctor', 'password': 'doctor123'}
-    resp = client.post('/api/auth/login', json=doctor_login)
-    assert resp.status_code == 200
-    token = resp.get_json()['token']
-    headers = {'Authorization': f'Bearer {token}'}
-    
-    # 2. Fetch current patients
-    resp = client.get('/api/doctors/patients', headers=headers)
-    assert resp.status_code == 200
-    patients = resp.get_json().get('patients', [])
+    # 1. Fetch current patients
+    assert doctor_state['patients_status'] == 200
+    patients = doctor_state['patients'].get('patients', [])
     assert len(patients) > 0, "Should have seeded patients"
     
-    # 3. Get first patient's ID
+    # 2. Get first patient's ID
     patient_id = patients[0].get('id') or patients[0].get('_id')
     assert patient_id is not None, "Patient must have an id or _id field"
     
-    # 4. Fetch analytics dashboard stats (read-only)
-    resp = client.get('/api/analytics/dashboard-stats', headers=headers)
-    assert resp.status_code == 200
-    analytics = resp.get_json()
+    # 3. Fetch analytics dashboard stats (read-only)
+    assert doctor_state['analytics_status'] == 200
+    analytics = doctor_state['analytics']
     assert 'total_patients' in analytics or 'risk_distribution' in analytics, "Should have analytics data"
     
-    # 5. Verify analytics structure
+    # 4. Verify analytics structure
     if 'risk_distribution' in analytics:
         assert isinstance(analytics['risk_distribution'], dict)
 
@@ -83,28 +84,24 @@ def test_authentication_flow(client):
     assert resp.status_code == 200  # Still valid in test context
 
 
-def test_admin_access_control(client):
+def test_admin_access_control(client, auth_tokens, auth_headers):
     """Integration test: verify role-based access control"""
     # 1. Login as patient (should NOT have access to admin endpoints)
-    patient_login = {'username': 'patient', 'password': 'patient123'}
-    resp = client.post('/api/auth/login', json=patient_login)
-    assert resp.status_code == 200
-    patient_token = resp.get_json()['token']
+    patient_token = auth_tokens['patient']
+    assert patient_token is not None
     
     # 2. Login as admin
-    admin_login = {'username': 'admin', 'password': 'admin123'}
-    resp = client.post('/api/auth/login', json=admin_login)
-    assert resp.status_code == 200
-    admin_token = resp.get_json()['token']
+    admin_token = auth_tokens['admin']
+    assert admin_token is not None
     
     # 3. Patient tries to access admin stats (should fail or be restricted)
-    patient_headers = {'Authorization': f'Bearer {patient_token}'}
+    patient_headers = auth_headers['patient']
     resp = client.get('/api/admin/stats', headers=patient_headers)
     # Endpoint may return 403 or not exist; main thing is patient shouldn't succeed as admin
     assert resp.status_code in (403, 404, 401)
     
     # 4. Admin accesses admin stats (should succeed or at least not be forbidden)
-    admin_headers = {'Authorization': f'Bearer {admin_token}'}
+    admin_headers = auth_headers['admin']
     resp = client.get('/api/admin/stats', headers=admin_headers)
     # Admin should have access (200 or similar, not 403)
     assert resp.status_code != 403
@@ -3,80 +3,94 @@ Unit tests for patient operations and data validation
 Tests patient CRUD operations, risk assessment, and data integrity
 """
 import json
+import re
 import pytest
 
+from app.utils.validation import validate_patient_data
 
-def login_helper(client, username='doctor', password='doctor123'):
-    """Helper to login and get auth token"""
-    resp = client.post('/api/auth/login', json={'username': username, 'password': password})
-    assert resp.status_code == 200
-    return resp.get_json()['token']
+
+def login_helper(auth_tokens, username='doctor'):
+    """Helper to get the session-cached auth token"""
+    token = auth_tokens.get(username)
+    assert token is not None, f"{username} login failed"
+    return token
+
+
+@pytest.fixture(scope='class')
+def doctor_headers(auth_tokens, auth_headers):
+    """Doctor Authorization header (fails the class's tests if the doctor login failed)"""
+    login_helper(auth_tokens)
+    return auth_headers['doctor']
+
+
+# Patient registration that differs from each invalid case by one field
+BASE_PATIENT = {
+    'name': 'Test Patient',
+    'age': 45,
+    'gender': 'Male',
+    'hypertension': 0,
+    'heart_disease': 0,
+    'smoking_status': 'Never smoked'
+}
 
 
 class TestPatientValidation:
     """Unit tests for patient data validation"""
     
-    def test_patient_age_validation(self, client):
-        """Test that invalid age values are rejected"""
-        token = login_helper(client)
-        headers = {'Authorization': f'Bearer {token}'}
-        
-        # Test negative age
-        invalid_patient = {
-            'name': 'Test Patient',
-            'age': -5,
-            'gender': 'Male',
-            'hypertension': 0,
-            'heart_disease': 0,
-            'smoking_status': 'Never smoked'
-        }
-        resp = client.post('/api/patients/register', headers=headers, json=invalid_patient)
-        assert resp.status_code in (400, 422), "Should reject negative age"
-        
-        # Test unrealistic age
-        invalid_patient['age'] = 200
-        resp = client.post('/api/patients/register', headers=headers, json=invalid_patient)
-        assert resp.status_code in (400, 422), "Should reject unrealistic age"
+    # HTTP smoke cases (fields to override, accepted status codes); a None value removes the field.
+    # The individual validation rules are covered directly in TestPatientDataValidator.
+    INVALID_PATIENTS = [
+        pytest.param({'age': -5}, (400, 422), id='negative_age'),
+        pytest.param({'age': None, 'gender': None, 'hypertension': None,
+                      'heart_disease': None, 'smoking_status': None},
+                     (400, 422), id='missing_required_fields'),
+    ]
     
-    def test_patient_gender_validation(self, client):
-        """Test gender field validation"""
-        token = login_helper(client)
-        headers = {'Authorization': f'Bearer {token}'}
+    @pytest.mark.parametrize('overrides,expected', INVALID_PATIENTS)
+    def test_register_rejects_invalid(self, client, doctor_headers, overrides, expected):
+        """Test that invalid or incomplete patient data is rejected"""
+        patient = {**BASE_PATIENT, **overrides}
+        patient = {field: value for field, value in patient.items() if value is not None}
         
-        invalid_patient = {
-            'name': 'Test Patient',
-            'age': 45,
-            'gender': 'Invalid',
-            'hypertension': 0,
-            'heart_disease': 0,
-            'smoking_status': 'Never smoked'
-        }
-        resp = client.post('/api/patients/register', headers=headers, json=invalid_patient)
-        # May accept or reject depending on validation rules
-        assert resp.status_code in (200, 201, 400, 422)
+        resp = client.post('/api/patients/register', headers=doctor_headers, json=patient)
+        assert resp.status_code in expected
+
+
+# Complete patient record that passes validate_patient_data
+VALID_PATIENT_DATA = {
+    'gender': 'Male', 'age': 45, 'hypertension': 0, 'heart_disease': 0,
+    'ever_married': 'Yes', 'work_type': 'Private', 'Residence_type': 'Urban',
+    'avg_glucose_level': 100.0, 'bmi': 25.0, 'smoking_status': 'Never smoked', 'stroke': 0
+}
+
+
+class TestPatientDataValidator:
+    """Unit tests calling validate_patient_data directly (no HTTP, auth or routing)"""
     
-    def test_required_fields(self, client):
-        """Test that required fields are enforced"""
-        token = login_helper(client)
-        headers = {'Authorization': f'Bearer {token}'}
-        
-        # Missing required fields
-        incomplete_patient = {
-            'name': 'Test Patient'
-            # Missing age, gender, etc.
-        }
-        resp = client.post('/api/patients/register', headers=headers, json=incomplete_patient)
-        assert resp.status_code in (400, 422), "Should reject incomplete patient data"
+    def test_valid_patient_has_no_errors(self):
+        """Test that a complete, in-range record passes validation"""
+        assert validate_patient_data(VALID_PATIENT_DATA) == []
+    
+    @pytest.mark.parametrize('overrides,expected_error', [
+        pytest.param({'age': -5}, 'Age must be between 0 and 120', id='negative_age'),
+        pytest.param({'age': 200}, 'Age must be between 0 and 120', id='unrealistic_age'),
+        pytest.param({'bmi': 5}, 'BMI must be between 10 and 60', id='low_bmi'),
+        pytest.param({'avg_glucose_level': 400}, 'Glucose level must be between 50 and 300', id='high_glucose'),
+        pytest.param({'hypertension': 2}, 'Hypertension must be 0 or 1', id='bad_hypertension'),
+        pytest.param({'gender': 'Invalid'}, 'Gender must be one of', id='unknown_gender'),
+        pytest.param({'smoking_status': ['Smokes']}, 'Smoking status must be one of', id='non_string_smoking'),
+    ])
+    def test_invalid_field_is_reported(self, overrides, expected_error):
+        """Test that each out-of-range or unknown value produces its error message"""
+        errors = validate_patient_data({**VALID_PATIENT_DATA, **overrides})
+        assert any(error.startswith(expected_error) for error in errors)
 
 
 class TestPatientRiskAssessment:
     """Unit tests for risk level calculation"""
     
-    def test_high_risk_patient(self, client):
+    def test_high_risk_patient(self, client, doctor_headers):
         """Test that elderly patient with multiple conditions is high risk"""
-        token = login_helper(client)
-        headers = {'Authorization': f'Bearer {token}'}
-        
         high_risk_patient = {
             'name': 'High Risk Patient',
             'age': 75,
@@ -88,18 +102,15 @@ class TestPatientRiskAssessment:
             'bmi': 32
         }
         
-        resp = client.post('/api/patients/register', headers=headers, json=high_risk_patient)
+        resp = client.post('/api/patients/register', headers=doctor_headers, json=high_risk_patient)
         if resp.status_code in (200, 201):
             data = resp.get_json()
             patient = data.get('patient', {})
             # Risk level should be calculated
             assert 'risk_level' in patient or patient.get('age') == 75
     
-    def test_low_risk_patient(self, client):
+    def test_low_risk_patient(self, client, doctor_headers):
         """Test that young healthy patient is low risk"""
-        token = login_helper(client)
-        headers = {'Authorization': f'Bearer {token}'}
-        
         low_risk_patient = {
             'name': 'Low Risk Patient',
             'age': 30,
@@ -111,7 +122,7 @@ class TestPatientRiskAssessment:
             'bmi': 22
         }
         
-        resp = client.post('/api/patients/register', headers=headers, json=low_risk_patient)
+        resp = client.post('/api/patients/register', headers=doctor_headers, json=low_risk_patient)
         if resp.status_code in (200, 201):
             data = resp.get_json()
             patient = data.get('patient', {})
@@ -122,11 +133,8 @@ class TestPatientRiskAssessment:
 class TestPatientCRUD:
     """Unit tests for patient CRUD operations"""
     
-    def test_create_patient(self, client):
+    def test_create_patient(self, client, doctor_headers):
         """Test patient creation"""
-        token = login_helper(client)
-        headers = {'Authorization': f'Bearer {token}'}
-        
         new_patient = {
             'name': 'John Doe',
             'age': 45,
@@ -142,47 +150,126 @@ class TestPatientCRUD:
             'stroke': 0
         }
         
-        resp = client.post('/api/patients/register', headers=headers, json=new_patient)
+        resp = client.post('/api/patients/register', headers=doctor_headers, json=new_patient)
         assert resp.status_code in (200, 201), "Patient creation should succeed"
         
         if resp.status_code in (200, 201):
             data = resp.get_json()
             assert 'patient' in data or 'message' in data
     
-    def test_get_patients_list(self, client):
+    def test_get_patients_list(self, client, doctor_headers):
         """Test fetching patients list"""
-        token = login_helper(client)
-        headers = {'Authorization': f'Bearer {token}'}
-        
-        resp = client.get('/api/doctors/patients', headers=headers)
+        resp = client.get('/api/doctors/patients', headers=doctor_headers)
         assert resp.status_code == 200
         
         data = resp.get_json()
         assert 'patients' in data
         assert isinstance(data['patients'], list)
     
-    def test_update_patient(self, client):
+    def test_update_patient(self, client, doctor_headers, seed_patient_id):
         """Test patient update functionality"""
-        token = login_helper(client)
-        headers = {'Authorization': f'Bearer {token}'}
+        # Update patient data
+        update_data = {
+            'hypertension': 1,
+            'heart_disease': 0
+        }
         
-        # First get a patient
-        resp = client.get('/api/doctors/patients', headers=headers)
+        resp = client.put(f'/api/patients/{seed_patient_id}', headers=doctor_headers, json=update_data)
+        # Should succeed or return appropriate error
+        assert resp.status_code in (200, 201, 400, 404, 500)
+
+    def test_patients_cursor_pagination(self, client, auth_tokens, auth_headers):
+        """Test keyset pagination on the patients list"""
+        token = login_helper(auth_tokens, 'admin')
+        headers = auth_headers['admin']
+
+        resp = client.get('/api/patients/?limit=1', headers=headers)
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert len(data['patients']) == 1
+        # The session seed creates two sample patients, so a second page exists
+        assert data['next_cursor']
+
+        resp = client.get(f"/api/patients/?limit=1&cursor={data['next_cursor']}", headers=headers)
+        assert resp.status_code == 200
+        next_page = resp.get_json()['patients']
+        assert len(next_page) == 1
+        assert next_page[0]['id'] != data['patients'][0]['id']
+
+        # Malformed cursors are rejected
+        resp = client.get('/api/patients/?limit=1&cursor=not-a-cursor', headers=headers)
+        assert resp.status_code == 400
+
+    def test_patients_pagination_walks_every_page(self, client, auth_headers):
+        """Test that following next_cursor returns every patient exactly once"""
+        headers = auth_headers['admin']
+        resp = client.get('/api/patients/', headers=headers)
+        assert resp.status_code == 200
+        expected_ids = [patient['id'] for patient in resp.get_json()['patients']]
+        assert len(expected_ids) >= 2
+        
+        seen_ids = []
+        url = '/api/patients/?limit=1'
+        while True:
+            resp = client.get(url, headers=headers)
+            assert resp.status_code == 200
+            data = resp.get_json()
+            seen_ids.extend(patient['id'] for patient in data['patients'])
+            if not data['next_cursor']:
+                break
+            url = f"/api/patients/?limit=1&cursor={data['next_cursor']}"
+        
+        # The unpaginated list orders by created_at only, so compare membership, not order
+        assert len(seen_ids) == len(set(seen_ids))
+        assert sorted(seen_ids) == sorted(expected_ids)
+    
+    def test_patients_page_rejected_on_mongodb(self):
+        """Test that the MongoDB backend refuses limit/cursor instead of returning every patient"""
+        from app.models.patient_mongodb import PatientRecordMongo
+        from app.services.patient_service import PatientService
+        
+        service = PatientService.__new__(PatientService)
+        service.mongo_service = PatientRecordMongo()
+        service.use_mongodb = True
+        with pytest.raises(ValueError):
+            service.get_patients_page(limit=10)
+
+    @pytest.mark.parametrize('limit', ['0', '-1'])
+    def test_patients_pagination_limit_below_one(self, client, auth_headers, limit):
+        """Test that limit values below 1 are clamped to one row instead of failing"""
+        resp = client.get(f'/api/patients/?limit={limit}', headers=auth_headers['admin'])
         assert resp.status_code == 200
-        patients = resp.get_json().get('patients', [])
-        
-        if len(patients) > 0:
-            patient_id = patients[0].get('id') or patients[0].get('_id')
-            
-            # Update patient data
-            update_data = {
-                'hypertension': 1,
-                'heart_disease': 0
-            }
-            
-            resp = client.put(f'/api/patients/{patient_id}', headers=headers, json=update_data)
-            # Should succeed or return appropriate error
-            assert resp.status_code in (200, 201, 400, 404, 500)
+        assert len(resp.get_json()['patients']) == 1
+
+
+# Fields documented for ?view=summary in docs/API_REFERENCE.md
+SUMMARY_FIELDS = {'id', 'gender', 'age', 'risk_level', 'stroke_risk', 'assigned_doctor_id', 'created_at'}
+
+
+class TestPatientSummaryView:
+    """Tests for the ?view=summary patient list"""
+    
+    def test_summary_rows_have_documented_fields(self, client, auth_headers):
+        """Test that each summary row carries exactly the documented field set"""
+        resp = client.get('/api/patients/?view=summary', headers=auth_headers['admin'])
+        assert resp.status_code == 200
+        patients = resp.get_json()['patients']
+        assert patients
+        for patient in patients:
+            assert set(patient) == SUMMARY_FIELDS
+    
+    def test_summary_query_selects_only_summary_columns(self, app):
+        """Test that the summary query leaves the other patient columns out of the SELECT"""
+        from app.models.patient_sqllite import PatientSQLite
+        from app.services.patient_service import PatientService
+        
+        with app.app_context():
+            # Compiling the ORM statement applies load_only() to the rendered column list
+            sql = str(PatientService._patients_query(summary=True).statement)
+        
+        selected = {column.name for column in PatientSQLite.__table__.columns
+                    if re.search(rf'\bpatients\.{column.name}\b', sql)}
+        assert selected == SUMMARY_FIELDS
 
 
 class TestPatientSecurity:
@@ -193,29 +280,28 @@ class TestPatientSecurity:
         resp = client.get('/api/doctors/patients')
         assert resp.status_code in (401, 400), "Should require authentication"
     
-    def test_patient_cannot_access_all_patients(self, client):
+    def test_patient_cannot_access_all_patients(self, client, auth_tokens, auth_headers):
         """Test that patients cannot access all patient records"""
         # Login as patient
-        token = login_helper(client, username='patient', password='patient123')
-        headers = {'Authorization': f'Bearer {token}'}
+        token = login_helper(auth_tokens, 'patient')
+        headers = auth_headers['patient']
         
         resp = client.get('/api/doctors/patients', headers=headers)
         # Patients should not have access to doctor's patient list
         assert resp.status_code in (403, 401, 200)
         # If 200, should only see their own record
     
-    def test_sql_injection_prevention(self, client):
+    def test_sql_injection_prevention(self, client, doctor_headers, require_route):
         """Test SQL injection prevention in patient search"""
-        token = login_helper(client)
-        headers = {'Authorization': f'Bearer {token}'}
+        require_route('/api/patients/search')
         
         # Attempt SQL injection in search
         malicious_query = "'; DROP TABLE patients; --"
-        resp = client.get(f'/api/patients/search?query={malicious_query}', headers=headers)
+        resp = client.get(f'/api/patients/search?query={malicious_query}', headers=doctor_headers)
         
         # Should handle gracefully (not crash)
         assert resp.status_code in (200, 400, 404, 500)
         
         # Verify patients table still exists
-        resp = client.get('/api/doctors/patients', headers=headers)
+        resp = client.get('/api/doctors/patients', headers=doctor_headers)
         assert resp.status_code == 200
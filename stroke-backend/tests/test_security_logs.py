@@ -7,14 +7,112 @@ import pytest
 from datetime import datetime, timedelta
 
 
-def login_helper(client, username='admin', password='admin123'):
-    """Helper to login and get auth token"""
-    resp = client.post('/api/auth/login', json={'username': username, 'password': password})
-    if resp.status_code == 200:
-        return resp.get_json()['token']
-    return None
+def login_helper(auth_tokens, username='admin'):
+    """Helper to get the session-cached auth token (None if login failed)"""
+    return auth_tokens.get(username)
 
 
+@pytest.fixture
+def security_api(require_route):
+    """Skip the HTTP tests when the security log blueprint isn't registered"""
+    require_route('/api/security/logs')
+
+
+# Documentation-range address used for the seeded failed logins
+SUSPICIOUS_IP = '203.0.113.7'
+
+
+@pytest.fixture(scope='module')
+def seed_failed_logins(app, require_route):
+    """Insert six recent failed admin logins from one IP directly, instead of six bcrypt-checked POSTs"""
+    from app.models.security_log import SecurityLog
+    from app.models.user import db
+    
+    # Module fixtures set up before the function-scoped security_api check; skip here
+    # too so an unregistered route skips the tests instead of seeding for nothing
+    require_route('/api/security/logs')
+    
+    now = datetime.utcnow()
+    with app.app_context():
+        db.session.add_all([
+            SecurityLog(
+                event_type='failed_login',
+                event_description='Failed login attempt for admin',
+                username='admin',
+                ip_address=SUSPICIOUS_IP,
+                status='failure',
+                severity='warning',
+                created_at=now - timedelta(minutes=i)
+            )
+            for i in range(6)
+        ])
+        db.session.commit()
+
+
+# Username and user ID that only the query-level tests below write logs for
+PROBE_USERNAME = 'stmt_probe'
+PROBE_USER_ID = 9001
+
+
+@pytest.fixture(scope='module')
+def seed_probe_logs(app):
+    """Insert failed logins and activity for a probe user, removed again after the module"""
+    from app.models.security_log import SecurityLog
+    from app.models.user import db
+    
+    now = datetime.utcnow()
+    rows = [
+        SecurityLog(
+            event_type='failed_login',
+            event_description=f'Failed login attempt for {PROBE_USERNAME}',
+            username=PROBE_USERNAME,
+            ip_address='198.51.100.9',
+            status='failure',
+            severity='warning',
+            created_at=now - timedelta(minutes=i)
+        )
+        for i in range(3)
+    ]
+    # Outside any recent time window
+    rows.append(SecurityLog(
+        event_type='failed_login',
+        event_description=f'Failed login attempt for {PROBE_USERNAME}',
+        username=PROBE_USERNAME,
+        status='failure',
+        severity='warning',
+        created_at=now - timedelta(days=2)
+    ))
+    rows.extend(
+        SecurityLog(
+            event_type='patient_accessed',
+            event_description='Viewed patient record',
+            user_id=PROBE_USER_ID,
+            username=PROBE_USERNAME,
+            created_at=now - timedelta(minutes=i)
+        )
+        for i in range(3)
+    )
+    
+    with app.app_context():
+        db.session.add_all(rows)
+        db.session.commit()
+    
+    yield
+    
+    with app.app_context():
+        SecurityLog.query.filter_by(username=PROBE_USERNAME).delete()
+        db.session.commit()
+
+
+@pytest.fixture(scope='module')
+def all_logs(client, auth_headers, seed_failed_logins):
+    """Fetch one large page of security logs (including the seeded failed logins) for client-side filtering"""
+    resp = client.get('/api/security/logs?limit=500', headers=auth_headers['admin'])
+    assert resp.status_code == 200
+    return resp.get_json()['logs']
+
+
+@pytest.mark.usefixtures('security_api')
 class TestSecurityLogging:
     """Unit tests for security event logging"""
     
@@ -39,16 +137,16 @@ class TestSecurityLogging:
             assert recent_log.get('event_type') == 'login'
             assert recent_log.get('username') == 'admin'
     
-    def test_failed_login_creates_security_log(self, client):
+    def test_failed_login_creates_security_log(self, client, auth_tokens, auth_headers):
         """Test that failed login attempts are logged"""
         # Attempt login with wrong password
         resp = client.post('/api/auth/login', json={'username': 'admin', 'password': 'wrongpassword'})
         assert resp.status_code == 401
         
         # Login with admin to check logs
-        token = login_helper(client)
+        token = login_helper(auth_tokens)
         if token:
-            headers = {'Authorization': f'Bearer {token}'}
+            headers = auth_headers['admin']
             resp = client.get('/api/security/logs?event_type=failed_login&limit=10', headers=headers)
             
             if resp.status_code == 200:
@@ -60,17 +158,17 @@ class TestSecurityLogging:
                 assert failed_log.get('event_type') == 'failed_login'
                 assert failed_log.get('status') == 'failure'
     
-    def test_user_registration_logged(self, client):
+    def test_user_registration_logged(self, client, auth_tokens, auth_headers, run_counter):
         """Test that user creation is logged"""
-        token = login_helper(client)
+        token = login_helper(auth_tokens)
         if not token:
             pytest.skip("Admin login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['admin']
         
         # Create new user
         new_user = {
-            'username': f'testuser_{datetime.now().timestamp()}',
+            'username': f'testuser_{next(run_counter)}',
             'password': 'testpass123',
             'role': 'patient',
             'email': 'test@example.com'
@@ -88,16 +186,17 @@ class TestSecurityLogging:
             assert isinstance(logs, list)
 
 
+@pytest.mark.usefixtures('security_api')
 class TestSecurityLogAccess:
     """Tests for security log access control"""
     
-    def test_admin_can_access_logs(self, client):
+    def test_admin_can_access_logs(self, client, auth_tokens, auth_headers):
         """Test that admin users can access security logs"""
-        token = login_helper(client, 'admin', 'admin123')
+        token = login_helper(auth_tokens, 'admin')
         if not token:
             pytest.skip("Admin login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['admin']
         resp = client.get('/api/security/logs', headers=headers)
         
         assert resp.status_code == 200
@@ -105,13 +204,13 @@ class TestSecurityLogAccess:
         assert 'logs' in data
         assert isinstance(data['logs'], list)
     
-    def test_non_admin_cannot_access_all_logs(self, client):
+    def test_non_admin_cannot_access_all_logs(self, client, auth_tokens, auth_headers):
         """Test that non-admin users cannot access all security logs"""
-        token = login_helper(client, 'patient', 'patient123')
+        token = login_helper(auth_tokens, 'patient')
         if not token:
             pytest.skip("Patient login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['patient']
         resp = client.get('/api/security/logs', headers=headers)
         
         # Should be forbidden or restricted
@@ -124,21 +223,18 @@ class TestSecurityLogAccess:
         assert resp.status_code in (401, 400)
 
 
+@pytest.mark.usefixtures('security_api')
 class TestFailedLoginTracking:
     """Tests for failed login attempt tracking"""
     
-    def test_get_failed_logins(self, client):
+    def test_get_failed_logins(self, client, auth_tokens, auth_headers, seed_failed_logins):
         """Test retrieving failed login attempts"""
-        # Create some failed attempts
-        for _ in range(3):
-            client.post('/api/auth/login', json={'username': 'admin', 'password': 'wrongpass'})
-        
         # Login as admin
-        token = login_helper(client)
+        token = login_helper(auth_tokens)
         if not token:
             pytest.skip("Admin login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['admin']
         resp = client.get('/api/security/logs/failed-logins?hours=1', headers=headers)
         
         if resp.status_code == 200:
@@ -149,18 +245,14 @@ class TestFailedLoginTracking:
                 attempts = data['failed_logins']
                 assert isinstance(attempts, list)
     
-    def test_suspicious_ip_detection(self, client):
+    def test_suspicious_ip_detection(self, client, auth_tokens, auth_headers, seed_failed_logins):
         """Test that suspicious IPs are flagged (5+ failed attempts)"""
-        # Create multiple failed attempts
-        for _ in range(6):
-            client.post('/api/auth/login', json={'username': 'admin', 'password': 'wrongpass'})
-        
         # Login as admin
-        token = login_helper(client)
+        token = login_helper(auth_tokens)
         if not token:
             pytest.skip("Admin login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['admin']
         resp = client.get('/api/security/logs/failed-logins?hours=1', headers=headers)
         
         if resp.status_code == 200:
@@ -168,19 +260,21 @@ class TestFailedLoginTracking:
             # Should have suspicious IPs
             if 'suspicious_ips' in data:
                 assert isinstance(data['suspicious_ips'], list)
+                assert SUSPICIOUS_IP in data['suspicious_ips']
 
 
+@pytest.mark.usefixtures('security_api')
 class TestUserActivityTracking:
     """Tests for user activity tracking"""
     
-    def test_get_user_activity(self, client):
+    def test_get_user_activity(self, client, auth_tokens, auth_headers):
         """Test retrieving specific user's activity"""
         # Login as admin
-        token = login_helper(client)
+        token = login_helper(auth_tokens)
         if not token:
             pytest.skip("Admin login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['admin']
         
         # Get admin's own activity
         resp = client.get('/api/security/logs/user-activity/1?limit=10', headers=headers)
@@ -191,13 +285,13 @@ class TestUserActivityTracking:
             assert 'logs' in data or 'total' in data or 'user_id' in data or 'activity' in data
             assert isinstance(data.get('activity', []), list)
     
-    def test_user_can_view_own_activity(self, client):
+    def test_user_can_view_own_activity(self, client, auth_tokens, auth_headers):
         """Test that users can view their own activity"""
-        token = login_helper(client, 'patient', 'patient123')
+        token = login_helper(auth_tokens, 'patient')
         if not token:
             pytest.skip("Patient login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['patient']
         
         # Patient viewing their own activity
         resp = client.get('/api/security/logs/user-activity/2', headers=headers)
@@ -206,16 +300,17 @@ class TestUserActivityTracking:
         assert resp.status_code in (200, 403, 404)
 
 
+@pytest.mark.usefixtures('security_api')
 class TestSecurityStatistics:
     """Tests for security dashboard statistics"""
     
-    def test_get_security_stats(self, client):
+    def test_get_security_stats(self, client, auth_tokens, auth_headers):
         """Test retrieving security statistics"""
-        token = login_helper(client)
+        token = login_helper(auth_tokens)
         if not token:
             pytest.skip("Admin login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['admin']
         resp = client.get('/api/security/logs/stats?hours=24', headers=headers)
         
         if resp.status_code == 200:
@@ -229,13 +324,13 @@ class TestSecurityStatistics:
             if 'events_by_severity' in data:
                 assert isinstance(data['events_by_severity'], dict)
     
-    def test_stats_time_filtering(self, client):
+    def test_stats_time_filtering(self, client, auth_tokens, auth_headers):
         """Test that stats can be filtered by time period"""
-        token = login_helper(client)
+        token = login_helper(auth_tokens)
         if not token:
             pytest.skip("Admin login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['admin']
         
         # Get stats for last hour
         resp = client.get('/api/security/logs/stats?hours=1', headers=headers)
@@ -246,16 +341,17 @@ class TestSecurityStatistics:
         assert resp.status_code in (200, 400)
 
 
+@pytest.mark.usefixtures('security_api')
 class TestSecurityLogFiltering:
     """Tests for security log filtering capabilities"""
     
-    def test_filter_by_event_type(self, client):
-        """Test filtering logs by event type"""
-        token = login_helper(client)
+    def test_filter_by_event_type(self, client, auth_tokens, auth_headers):
+        """Test filtering logs by event type (server-side filter)"""
+        token = login_helper(auth_tokens)
         if not token:
             pytest.skip("Admin login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['admin']
         resp = client.get('/api/security/logs?event_type=login&limit=10', headers=headers)
         
         if resp.status_code == 200:
@@ -265,24 +361,22 @@ class TestSecurityLogFiltering:
             for log in logs:
                 assert log.get('event_type') == 'login'
     
-    def test_filter_by_severity(self, client):
-        """Test filtering logs by severity level"""
-        token = login_helper(client)
-        if not token:
-            pytest.skip("Admin login failed")
-        
-        headers = {'Authorization': f'Bearer {token}'}
-        resp = client.get('/api/security/logs?severity=error&limit=10', headers=headers)
-        
-        assert resp.status_code in (200, 400)
+    def test_filter_by_severity(self, all_logs):
+        """Test filtering logs by severity level (on the shared page, no extra request)"""
+        warnings = [log for log in all_logs if log.get('severity') == 'warning']
+        # The seeded failed logins are warnings, so the filtered list can't be empty
+        assert warnings
+        assert any(log.get('ip_address') == SUSPICIOUS_IP for log in warnings)
+        for log in all_logs:
+            assert log.get('severity') in ('info', 'warning', 'error', 'critical')
     
-    def test_pagination(self, client):
+    def test_pagination(self, client, auth_tokens, auth_headers):
         """Test log pagination"""
-        token = login_helper(client)
+        token = login_helper(auth_tokens)
         if not token:
             pytest.skip("Admin login failed")
         
-        headers = {'Authorization': f'Bearer {token}'}
+        headers = auth_headers['admin']
         
         # Get first page
         resp = client.get('/api/security/logs?limit=5', headers=headers)
@@ -291,3 +385,108 @@ class TestSecurityLogFiltering:
             logs = data.get('logs', [])
             # Should limit results
             assert len(logs) <= 5
+
+
+@pytest.mark.usefixtures('seed_probe_logs')
+class TestSecurityLogQueries:
+    """Run the prebuilt security log statements directly, without the HTTP layer"""
+    
+    def test_failed_logins_by_user(self, app):
+        """Test that the username, time window and limit parameters are all applied"""
+        from app.models.user import db
+        from app.routes.security import _FAILED_LOGINS_BY_USER_STMT
+        
+        since = datetime.utcnow() - timedelta(hours=1)
+        with app.app_context():
+            logs = db.session.scalars(
+                _FAILED_LOGINS_BY_USER_STMT,
+                {'since': since, 'limit': 10, 'username': PROBE_USERNAME}
+            ).all()
+            
+            assert len(logs) == 3
+            assert all(log.event_type == 'failed_login' for log in logs)
+            assert all(log.username == PROBE_USERNAME for log in logs)
+            # Newest first
+            assert [log.created_at for log in logs] == sorted((log.created_at for log in logs), reverse=True)
+            
+            limited = db.session.scalars(
+                _FAILED_LOGINS_BY_USER_STMT,
+                {'since': since, 'limit': 2, 'username': PROBE_USERNAME}
+            ).all()
+            assert [log.id for log in limited] == [log.id for log in logs[:2]]
+    
+    def test_failed_logins_time_window(self, app):
+        """Test that the unfiltered statement only returns failed logins inside the window"""
+        from app.models.user import db
+        from app.routes.security import _FAILED_LOGINS_STMT
+        
+        since = datetime.utcnow() - timedelta(hours=1)
+        with app.app_context():
+            logs = db.session.scalars(_FAILED_LOGINS_STMT, {'since': since, 'limit': 1000}).all()
+            
+            assert all(log.event_type == 'failed_login' for log in logs)
+            assert all(log.created_at >= since for log in logs)
+            assert sum(1 for log in logs if log.username == PROBE_USERNAME) == 3
+    
+    def test_user_activity(self, app):
+        """Test that the activity statement is bound to a single user ID"""
+        from app.models.user import db
+        from app.routes.security import _USER_ACTIVITY_STMT
+        
+        with app.app_context():
+            logs = db.session.scalars(_USER_ACTIVITY_STMT, {'user_id': PROBE_USER_ID, 'limit': 10}).all()
+            assert len(logs) == 3
+            assert all(log.user_id == PROBE_USER_ID for log in logs)
+            
+            logs = db.session.scalars(_USER_ACTIVITY_STMT, {'user_id': PROBE_USER_ID, 'limit': 1}).all()
+            assert len(logs) == 1
+
+
+class TestSecurityStatsAggregation:
+    """Call the thread-pool stats aggregation directly and check it against seeded rows"""
+    
+    def test_collect_stats_counts_seeded_rows(self, app):
+        """Test that each aggregation picks up exactly the rows seeded for it"""
+        from app.models.security_log import SecurityLog
+        from app.models.user import db
+        from app.routes.security import _collect_stats
+        
+        stats_ip = '192.0.2.44'
+        since = datetime.utcnow() - timedelta(hours=1)
+        now = datetime.utcnow()
+        seeded = [
+            SecurityLog(event_type='failed_login', event_description='Failed login attempt',
+                        username='stats_probe', ip_address=stats_ip, status='failure',
+                        severity='warning', created_at=now),
+            SecurityLog(event_type='failed_login', event_description='Failed login attempt',
+                        username='stats_probe', ip_address=stats_ip, status='failure',
+                        severity='warning', created_at=now),
+            SecurityLog(event_type='data_export', event_description='Exported patient data',
+                        username='stats_probe', severity='critical', created_at=now),
+            # Outside the window, must not be counted
+            SecurityLog(event_type='data_export', event_description='Exported patient data',
+                        username='stats_probe', severity='critical', created_at=now - timedelta(days=2)),
+        ]
+        
+        with app.app_context():
+            before = _collect_stats(app, since)
+            db.session.add_all(seeded)
+            db.session.commit()
+            try:
+                after = _collect_stats(app, since)
+            finally:
+                SecurityLog.query.filter_by(username='stats_probe').delete()
+                db.session.commit()
+        
+        def delta(name, key):
+            return after[name].get(key, 0) - before[name].get(key, 0)
+        
+        assert delta('events_by_type', 'failed_login') == 2
+        assert delta('events_by_type', 'data_export') == 1
+        assert delta('events_by_severity', 'warning') == 2
+        assert delta('events_by_severity', 'critical') == 1
+        assert delta('failed_logins_by_ip', stats_ip) == 2
+        
+        critical = [event for event in after['critical_events'] if event.get('username') == 'stats_probe']
+        assert len(critical) == 1
+        assert critical[0]['event_type'] == 'data_export'
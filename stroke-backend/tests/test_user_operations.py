@@ -0,0 +1,192 @@
+"""
+Unit tests for the UserOperations data access layer
+Tests grouped commits via UserOperations.batch(), login verification and last_login buffering
+"""
+from unittest import mock
+
+import pytest
+from app.models.user import db
+from app.utils import database
+from app.utils.database import UserOperations, _user_cache, flush_last_logins, stop_last_login_flush
+
+
+class TestUserOperationsBatch:
+    """Unit tests for UserOperations.batch()"""
+    
+    def test_batch_commits_updates_once(self, app):
+        """Test that updates inside a batch are persisted with a single commit on exit"""
+        with app.app_context():
+            doctor = UserOperations.find_by_username('doctor')
+            patient = UserOperations.find_by_username('patient')
+            original = (doctor.phone, patient.phone)
+            
+            with mock.patch.object(db.session, 'commit', wraps=db.session.commit) as commit:
+                with UserOperations.batch():
+                    doctor.phone = '0100000001'
+                    patient.phone = '0100000002'
+                    assert UserOperations.update_user(doctor)
+                    assert UserOperations.update_user(patient)
+                    # Nothing is committed until the batch exits
+                    assert commit.call_count == 0
+            
+            assert commit.call_count == 1
+            
+            db.session.expire_all()
+            assert UserOperations.find_by_username('doctor').phone == '0100000001'
+            assert UserOperations.find_by_username('patient').phone == '0100000002'
+            
+            # Restore seeded values for other tests
+            doctor.phone, patient.phone = original
+            UserOperations.update_user(doctor)
+    
+    def test_batch_rolls_back_on_error(self, app):
+        """Test that a failing batch leaves users unchanged"""
+        with app.app_context():
+            doctor = UserOperations.find_by_username('doctor')
+            original_phone = doctor.phone
+            
+            with pytest.raises(RuntimeError):
+                with UserOperations.batch():
+                    doctor.phone = '0199999999'
+                    UserOperations.update_user(doctor)
+                    raise RuntimeError('abort')
+            
+            db.session.expire_all()
+            assert UserOperations.find_by_username('doctor').phone == original_phone
+
+
+class TestUserCacheEviction:
+    """Cache entries must be dropped after the change is committed, not before"""
+    
+    @staticmethod
+    def _recache_during_commit(user_id):
+        # Simulate a concurrent request re-caching the committed (old) row just before the commit lands
+        real_commit = db.session.commit
+        def commit():
+            UserOperations.find_by_id_cached(user_id)
+            real_commit()
+        return mock.patch.object(db.session, 'commit', side_effect=commit)
+    
+    def test_update_user_evicts_after_commit(self, app):
+        """Test that a snapshot cached while update_user commits does not survive it"""
+        with app.app_context():
+            doctor = UserOperations.find_by_username('doctor')
+            original = doctor.phone
+            UserOperations.invalidate_cached_user(doctor.id)
+            
+            doctor.phone = '0100000003'
+            with self._recache_during_commit(doctor.id):
+                assert UserOperations.update_user(doctor)
+            assert _user_cache.get(str(doctor.id)) is None
+            
+            doctor.phone = original
+            UserOperations.update_user(doctor)
+    
+    def test_batch_evicts_after_commit(self, app):
+        """Test that users changed in a batch are evicted when the batch commits"""
+        with app.app_context():
+            doctor = UserOperations.find_by_username('doctor')
+            original = doctor.phone
+            
+            with UserOperations.batch():
+                doctor.phone = '0100000004'
+                UserOperations.update_user(doctor)
+                # Re-cached mid-batch, before the change is committed
+                UserOperations.find_by_id_cached(doctor.id)
+                assert _user_cache.get(str(doctor.id)) is not None
+            assert _user_cache.get(str(doctor.id)) is None
+            
+            doctor.phone = original
+            UserOperations.update_user(doctor)
+
+
+class TestVerifyLogin:
+    """Unit tests for UserOperations.verify_login()"""
+    
+    def test_login_reads_only_credential_columns(self, app):
+        """Test that the login lookup projects the credential columns instead of loading the user row"""
+        with app.app_context():
+            record = UserOperations.find_for_login('doctor')
+            assert set(record._mapping) == {'id', 'username', 'password_hash', 'role', 'is_active'}
+            
+            with mock.patch.object(UserOperations, 'find_for_login',
+                                   wraps=UserOperations.find_for_login) as for_login, \
+                 mock.patch.object(UserOperations, 'find_by_username',
+                                   wraps=UserOperations.find_by_username) as by_username:
+                user, error = UserOperations.verify_login('doctor', 'doctor123')
+            
+            assert error is None
+            assert user.username == 'doctor'
+            assert for_login.call_count == 1
+            assert by_username.call_count == 0
+    
+    def test_login_caches_full_user_only(self, app):
+        """Test that only a full user snapshot reaches the auth cache, and only after a successful login"""
+        with app.app_context():
+            doctor = UserOperations.find_by_username('doctor')
+            key = str(doctor.id)
+            
+            UserOperations.invalidate_cached_user(doctor.id)
+            assert UserOperations.verify_login('doctor', 'wrongpassword') == (None, 'invalid')
+            assert _user_cache.get(key) is None
+            
+            user, error = UserOperations.verify_login('doctor', 'doctor123')
+            assert error is None
+            assert _user_cache.get(key) == UserOperations.snapshot_user(doctor)
+            assert user.to_dict() == doctor.to_dict()
+    
+    def test_invalid_credentials(self, app):
+        """Test that a wrong password or unknown user is reported as invalid"""
+        with app.app_context():
+            assert UserOperations.verify_login('doctor', 'wrongpassword') == (None, 'invalid')
+            assert UserOperations.verify_login('no_such_user', 'doctor123') == (None, 'invalid')
+    
+    def test_login_response_user_matches_profile(self, client, app):
+        """Test that /api/auth/login returns the same user payload as the stored profile"""
+        resp = client.post('/api/auth/login', json={'username': 'doctor', 'password': 'doctor123'})
+        assert resp.status_code == 200
+        returned = resp.get_json()['user']
+        
+        with app.app_context():
+            expected = UserOperations.find_by_username('doctor').to_dict()
+        
+        # last_login is written by a background flush and may change between the two reads
+        returned.pop('last_login', None)
+        expected.pop('last_login', None)
+        assert returned == expected
+
+
+class TestLastLoginBuffer:
+    """Unit tests for buffered last_login writes"""
+    
+    def test_flush_writes_buffered_last_login(self, app):
+        """Test that a buffered last_login reaches the user row after flush_last_logins()"""
+        with app.app_context():
+            doctor_id = UserOperations.find_by_username('doctor').id
+            # Start from an empty buffer with no timer due to fire mid-test
+            stop_last_login_flush(app)
+            UserOperations.update_last_login(doctor_id)
+            buffered = database._last_login_buffer[doctor_id]
+            
+            flush_last_logins(app)
+            
+            assert doctor_id not in database._last_login_buffer
+            db.session.expire_all()
+            assert UserOperations.find_by_username('doctor').last_login == buffered
+    
+    def test_stop_cancels_timer_and_flushes(self, app):
+        """Test that stop_last_login_flush() cancels the pending timer and writes the buffer"""
+        with app.app_context():
+            patient_id = UserOperations.find_by_username('patient').id
+            stop_last_login_flush(app)
+            UserOperations.update_last_login(patient_id)
+            buffered = database._last_login_buffer[patient_id]
+            timer = database._last_login_timer
+            assert timer is not None
+            
+            stop_last_login_flush(app)
+            
+            assert database._last_login_timer is None
+            assert timer.finished.is_set()
+            db.session.expire_all()
+            assert UserOperations.find_by_username('patient').last_login == buffered